@@ -1,21 +1,30 @@
 """The Tesla Wall Charger Director integration."""
 import asyncio
 
-from twcdirector.listener import TWCListener
-from twcdirector.device import TWCPeripheral
-
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.const import (EVENT_HOMEASSISTANT_STOP)
+from homeassistant.util import slugify
 
 from .const import (
     DOMAIN,
     CONF_RS485_INTERFACE,
-    CONF_SHARED_MAX_CURRENT
+    CONF_RS485_INTERFACES,
+    CONF_SHARED_MAX_CURRENT,
+    DEFAULT_SHARED_MAX_CURRENT,
+    CONF_COMMAND_DEBOUNCE,
+    DEFAULT_COMMAND_DEBOUNCE,
+    CONF_LOAD_BALANCING,
+    CONF_SOLAR,
+    CONF_SOLAR_SENSOR,
+    CONF_CAPTURE,
+    CONF_LISTENER_THREAD,
+    CONF_TRAFFIC_BUFFER,
+    DEFAULT_TRAFFIC_BUFFER
 )
 
-from .event import (
-    TWCDeviceEvent
+from .sessions import (
+    TWCSessionLog
 )
 
 import logging
@@ -33,70 +42,240 @@ async def async_setup(hass: HomeAssistant, config: dict):
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Set up Tesla Wall Charger Director from a config entry."""
+    # The listener and everything driving it pull in twcdirector and aioserial, only import them once a bus is set up
+    from .listener import TWCDirectorListener
+    from .probe import interface_path
+    from .discovery import TWCDiscoveryCoordinator
+    from .services import async_register_services
+    from .telemetry import TWCTelemetryHub, async_register_websocket_commands
+    from .inventory import TWCInventory
+    from .balancer import TWCLoadBalancer
+    from .solar import TWCSolarFollower
+    from .health import TWCHealthMonitor
+    from .thread import TWCListenerThread, TWCLoopHandoff
+    from .supervisor import TWCListenerSupervisor
+
+    async_register_websocket_commands(hass)
+    async_register_services(hass)
+
+    inventory = TWCInventory(hass, entry)
+    await inventory.async_load()
+    session_log = TWCSessionLog(hass, entry)
+    await session_log.async_load()
 
     listener_config = entry.data
 
     listener_options = {
         "event_loop": hass.loop
     }
+    listener_thread = None
+
+    # All the buses of an entry share one thread and one handoff
+    if entry.options.get(CONF_LISTENER_THREAD, False):
+        listener_thread = TWCListenerThread(f"{DOMAIN} {entry.title}")
+        listener_options["event_loop"] = listener_thread.loop
+        listener_options["handoff"] = TWCLoopHandoff(hass)
 
-    if CONF_RS485_INTERFACE in listener_config:
-        listener_options["interface"] = f"/dev/{listener_config[CONF_RS485_INTERFACE]}"
+    # Each controller only caps the commands it sends, the budget shared by the buses is kept by the load balancer
     if CONF_SHARED_MAX_CURRENT in listener_config:
         listener_options["shared_max_current"] = listener_config[CONF_SHARED_MAX_CURRENT]
 
-    twc_listener = TWCListener(**listener_options)
+    def listener_factory(interface):
+        return lambda: TWCDirectorListener(interface=interface, **listener_options)
 
-    hass.loop.create_task(twc_listener.process_transmit_messages())
-    hass.loop.create_task(twc_listener.listen())
+    interfaces = [interface_path(interface) for interface in listener_config[CONF_RS485_INTERFACES]]
+    supervisor = TWCListenerSupervisor(
+        hass, entry, {interface: listener_factory(interface) for interface in interfaces}, listener_thread)
+    await supervisor.async_start()
+    twc_listeners = supervisor.twc_listeners
 
     # Shutdown event closure
     async def async_shutdown_event(call):
         _LOGGER.info("Shutting down Tesla Wall Charger Director")
-        await twc_listener.shutdown()
+        await supervisor.async_stop()
 
-    hass.bus.async_listen(EVENT_HOMEASSISTANT_STOP, async_shutdown_event)
+    entry.async_on_unload(hass.bus.async_listen(EVENT_HOMEASSISTANT_STOP, async_shutdown_event))
 
     hass.data[DOMAIN].setdefault(entry.entry_id, {})
-    hass.data[DOMAIN][entry.entry_id]["twc_listener"] = twc_listener
+    hass.data[DOMAIN][entry.entry_id]["buses"] = {interface: {"twc_listener": twc_listener}
+                                                  for interface, twc_listener in twc_listeners.items()}
+    hass.data[DOMAIN][entry.entry_id]["supervisor"] = supervisor
+    hass.data[DOMAIN][entry.entry_id]["inventory"] = inventory
+    hass.data[DOMAIN][entry.entry_id]["session_log"] = session_log
+    inventory.start()
+
+    health = TWCHealthMonitor(hass, twc_listeners.values())
+    hass.data[DOMAIN][entry.entry_id]["health"] = health
+    health.start()
+
+    async_update_traffic_recorder(hass, entry)
+
+    discovery = TWCDiscoveryCoordinator(hass, entry, twc_listeners.values(), inventory)
+    hass.data[DOMAIN][entry.entry_id]["discovery"] = discovery
+    discovery.async_restore_devices()
+    discovery.start()
+
+    hass.data[DOMAIN][entry.entry_id]["telemetry"] = TWCTelemetryHub(hass, entry, discovery)
+
+    balancer = TWCLoadBalancer(hass, entry, listener_config.get(CONF_SHARED_MAX_CURRENT, DEFAULT_SHARED_MAX_CURRENT))
+    balancer.apply_options(entry.options)
+    hass.data[DOMAIN][entry.entry_id]["balancer"] = balancer
+
+    solar = TWCSolarFollower(hass, entry, balancer)
+    solar.apply_options(entry.options)
+    hass.data[DOMAIN][entry.entry_id]["solar"] = solar
+
+    if _balancing_enabled(entry.options):
+        balancer.start(discovery)
+
+    if _solar_enabled(entry.options):
+        solar.start()
+
+    await async_update_capture(hass, entry)
 
-    device_queue = asyncio.Queue()
+    entry.async_on_unload(entry.add_update_listener(async_options_updated))
 
-    twc_listener.register_device_queue(device_queue)
+    hass.config_entries.async_setup_platforms(entry, PLATFORMS)
+
+    return True
 
-    hass.loop.create_task(new_device_processor(device_queue, hass, entry))
 
-    for platform in PLATFORMS:
-        hass.async_create_task(
-            hass.config_entries.async_forward_entry_setup(entry, platform))
+async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Migrate an entry for a single interface to the list of interfaces it manages."""
+    if entry.version == 1:
+        data = dict(entry.data)
+        data[CONF_RS485_INTERFACES] = [data.pop(CONF_RS485_INTERFACE)]
+        entry.version = 2
+        hass.config_entries.async_update_entry(entry, data=data)
+        _LOGGER.info(f"Migrated {entry.title} to version 2")
 
     return True
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Unload a config entry."""
-    unload_ok = all(await asyncio.gather(*[
-        hass.config_entries.async_forward_entry_unload(entry, component)
-        for component in PLATFORMS
-    ]))
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
 
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        from .services import async_remove_services
+
+        entry_data = hass.data[DOMAIN].pop(entry.entry_id)
+        await entry_data["discovery"].async_stop()
+        # Stopping the follower lifts the surplus limit, which would otherwise balance the chargers again
+        await entry_data["balancer"].async_stop()
+        entry_data["solar"].stop()
+        entry_data["telemetry"].stop()
+        entry_data["health"].stop()
+
+        for bus_data in entry_data["buses"].values():
+            if "traffic_recorder" in bus_data:
+                bus_data["traffic_recorder"].stop()
+
+            if "capture" in bus_data:
+                await bus_data["capture"].async_stop()
+
+        for dispatcher in entry_data.get("dispatchers", {}).values():
+            _LOGGER.debug(f"Dispatcher wrote {dispatcher.write_count} states, skipped {dispatcher.skipped_count}")
+            dispatcher.stop()
+
+        for meter in entry_data.get("meters", {}).values():
+            meter.stop()
+
+        await asyncio.gather(*[pipeline.async_stop() for pipeline in entry_data.get("pipelines", {}).values()])
+
+        # Closes the interface so a reload can open it again
+        await entry_data["supervisor"].async_stop()
+        await entry_data["inventory"].async_stop()
+        await entry_data["session_log"].async_stop()
+
+        if not hass.data[DOMAIN]:
+            async_remove_services(hass)
 
     return unload_ok
 
 
-async def new_device_processor(device_queue, hass, entry):
-    while True:
-        new_device = await device_queue.get()
+async def async_options_updated(hass: HomeAssistant, entry: ConfigEntry):
+    """Apply updated options to the running entities."""
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+
+    # The listener is only moved to or from its thread by setting the entry up again
+    if entry.options.get(CONF_LISTENER_THREAD, False) != entry_data["supervisor"].threaded:
+        hass.async_create_task(hass.config_entries.async_reload(entry.entry_id))
+        return
+
+    balancer = entry_data["balancer"]
+    balancer.apply_options(entry.options)
+    solar = entry_data["solar"]
+    solar_sensor = solar.sensor
+    solar.apply_options(entry.options)
+
+    if not _balancing_enabled(entry.options) and balancer.is_running:
+        await balancer.async_stop()
+
+    # Restarting the follower would drop the sustained surplus, only restart it for a new sensor
+    if solar.is_running and (not _solar_enabled(entry.options) or solar.sensor != solar_sensor):
+        solar.stop()
+
+    if _balancing_enabled(entry.options) and not balancer.is_running:
+        balancer.start(entry_data["discovery"])
+
+    if _solar_enabled(entry.options) and not solar.is_running:
+        solar.start()
+
+    await async_update_capture(hass, entry)
+    async_update_traffic_recorder(hass, entry)
+
+    for pipeline in hass.data[DOMAIN][entry.entry_id].get("pipelines", {}).values():
+        pipeline.set_debounce(entry.options.get(CONF_COMMAND_DEBOUNCE, DEFAULT_COMMAND_DEBOUNCE))
+
+    for dispatcher in hass.data[DOMAIN][entry.entry_id].get("dispatchers", {}).values():
+        for entity in dispatcher.entities:
+            if hasattr(entity, "apply_options"):
+                entity.apply_options(entry.options)
+
+
+def _solar_enabled(options):
+    return options.get(CONF_SOLAR, False) and bool(options.get(CONF_SOLAR_SENSOR, None))
+
+
+def _balancing_enabled(options):
+    """The solar follower shares the surplus through the load balancer."""
+    return options.get(CONF_LOAD_BALANCING, False) or _solar_enabled(options)
+
+
+@callback
+def async_update_traffic_recorder(hass: HomeAssistant, entry: ConfigEntry):
+    """Start, resize or stop the traffic recorder of every bus to match the entry options."""
+    from .capture import TWCTrafficRecorder
+
+    capacity = entry.options.get(CONF_TRAFFIC_BUFFER, DEFAULT_TRAFFIC_BUFFER)
+
+    for interface, bus_data in hass.data[DOMAIN][entry.entry_id]["buses"].items():
+        traffic_recorder = bus_data.get("traffic_recorder", None)
+
+        if traffic_recorder is not None and traffic_recorder.capacity == capacity:
+            continue
+
+        if traffic_recorder is not None:
+            bus_data.pop("traffic_recorder").stop()
+
+        if capacity:
+            traffic_recorder = TWCTrafficRecorder(capacity)
+            traffic_recorder.start(bus_data["twc_listener"])
+            bus_data["traffic_recorder"] = traffic_recorder
+            _LOGGER.debug(f"Recording the last {capacity} frames on {interface} in {traffic_recorder.memory_size} bytes")
+
+
+async def async_update_capture(hass: HomeAssistant, entry: ConfigEntry):
+    """Start or stop capturing the traffic of every bus to its own file to match the entry options."""
+    from .capture import TWCFrameCapture
 
-        if isinstance(new_device, TWCPeripheral):
-            event_entity = TWCDeviceEvent(hass, new_device)
-            device_registry = hass.helpers.device_registry.async_get(hass)
-            device_info = event_entity.device_info
-            device_info["config_entry_id"] = entry.entry_id
-            device = device_registry.async_get_or_create(**device_info)
-            event_entity.entity_id = device.id
-            _LOGGER.debug(f"Trigger Device Info: {device_info}")
+    enabled = entry.options.get(CONF_CAPTURE, False)
 
-        device_queue.task_done()
+    for interface, bus_data in hass.data[DOMAIN][entry.entry_id]["buses"].items():
+        if enabled and "capture" not in bus_data:
+            capture = TWCFrameCapture(hass, hass.config.path(f"{DOMAIN}_{entry.entry_id}_{slugify(interface)}.cap"))
+            await capture.async_start(bus_data["twc_listener"])
+            bus_data["capture"] = capture
+        elif not enabled and "capture" in bus_data:
+            await bus_data.pop("capture").async_stop()
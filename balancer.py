@@ -0,0 +1,338 @@
+"""The Tesla Wall Charger Director integration."""
+import asyncio
+import logging
+import time
+from itertools import groupby
+
+from twcdirector.device import TWCPeripheral
+from twcdirector.protocol import Commands, Status
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.helpers.event import async_call_later
+
+from .command import async_get_command_pipeline
+from .health import async_time_callbacks
+from .const import (
+    CONF_CHARGERS,
+    CONF_PRIORITY,
+    CONF_MIN_CURRENT,
+    DEFAULT_PRIORITY,
+    DEFAULT_MIN_CURRENT
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Seconds between allocations, long enough for the chargers to apply the previous one
+BALANCE_INTERVAL = 5
+CURRENT_STEP = 100
+
+INACTIVE_STATES = (Status.READY, Status.ERROR, Status.UNKNOWN)
+
+
+class TWCLoadBalancer:
+    """Share the supply current between the chargers on a bus.
+
+    Every status and meter update is checked against the inputs of the
+    last allocation, only a change of a charger's activity or maximum
+    current schedules a new allocation. Allocations run at most once every
+    BALANCE_INTERVAL seconds and only chargers whose allocated current
+    changed are sent a command. The decreases skip the debounce and are all
+    queued for the bus before any increase is sent.
+
+    Active chargers are given their minimum current in priority order while
+    the shared limit allows, a charger that can not be given its minimum is
+    paused. The remaining current is shared equally between the chargers of
+    each priority level in turn, up to each charger's maximum current.
+
+    The shared limit can be lowered by set_available_current(), which the
+    solar follower uses to share only the surplus power.
+
+    The controller answers a charger's negotiation with its setpoint
+    current before the next allocation can correct it, so the setpoints
+    are capped too. An active charger's setpoint is its allocation, the
+    current left unallocated is split between the idle chargers. The
+    setpoints chosen with the default current entities are restored when
+    the balancer stops.
+    """
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, shared_max_current):
+        self._hass = hass
+        self._entry = entry
+        self._shared_max_current = shared_max_current
+        self._available_current = None
+        self._charger_options = {}
+        self._devices = {}
+        self._callbacks = {}
+        self._inputs = {}
+        self._allocation = {}
+        self._default_setpoints = {}
+        self._setpoints = {}
+        self._last_balance = None
+        self._unsub_balance = None
+        self._send_task = None
+        self._remove_device_listener = None
+        self._discovery = None
+        self._balance_count = 0
+        self._command_count = 0
+
+    def start(self, discovery):
+        self._discovery = discovery
+        self._remove_device_listener = discovery.async_add_device_listener(self.async_track_device)
+
+    async def async_stop(self):
+        if self._remove_device_listener:
+            self._remove_device_listener()
+            self._remove_device_listener = None
+
+        if self._unsub_balance:
+            self._unsub_balance()
+            self._unsub_balance = None
+
+        send_task = self._send_task
+        self._send_task = None
+
+        for serial, twc_device in self._devices.items():
+            twc_device.deregister_device_data_updated_callback(self._callbacks[serial])
+
+            # Unless it was set again through the default current entity
+            if twc_device.get_setpoint_current() == self._setpoints.get(serial):
+                twc_device.set_setpoint_current(self._default_setpoints[serial])
+
+        self._devices = {}
+        self._callbacks = {}
+        self._inputs = {}
+        self._allocation = {}
+        self._default_setpoints = {}
+        self._setpoints = {}
+
+        # The balancer is stopped once no command it queued can still land
+        if send_task:
+            send_task.cancel()
+            await asyncio.gather(send_task, return_exceptions=True)
+
+    @property
+    def is_running(self):
+        return self._remove_device_listener is not None
+
+    @property
+    def shared_max_current(self):
+        return self._shared_max_current
+
+    @property
+    def allocation(self):
+        return dict(self._allocation)
+
+    @property
+    def balance_count(self):
+        return self._balance_count
+
+    @property
+    def command_count(self):
+        return self._command_count
+
+    def apply_options(self, options):
+        self._charger_options = options.get(CONF_CHARGERS, {})
+
+        if self.is_running:
+            self._async_schedule()
+
+    def set_shared_max_current(self, shared_max_current):
+        self._shared_max_current = shared_max_current
+
+        if self.is_running:
+            self._async_schedule()
+
+    def set_available_current(self, available_current):
+        """Limit the shared current to available_current in 100ths of an amp, None removes the limit."""
+        if available_current == self._available_current:
+            return
+
+        self._available_current = available_current
+
+        if self.is_running:
+            self._async_schedule()
+
+    def delivered_current(self):
+        """Return the current in 100ths of an amp delivered by the balanced chargers."""
+        return sum(twc_device.get_status_current_delivered() for twc_device in self._devices.values())
+
+    def start_current(self):
+        """Return the lowest current in 100ths of an amp a charger can be started with."""
+        if not self._devices:
+            return self._min_current(None)
+
+        return min(min(self._min_current(serial), twc_device.get_max_current())
+                   for serial, twc_device in self._devices.items())
+
+    @callback
+    def async_track_device(self, twc_device: TWCPeripheral):
+        """Follow a charger added to or bound by the discovery coordinator."""
+        # Chargers restored from the inventory only take part once they are on the bus
+        if not self._discovery.is_live_device(twc_device):
+            return
+
+        serial = twc_device.get_serial()
+
+        if serial in self._devices:
+            self._devices[serial].deregister_device_data_updated_callback(self._callbacks[serial])
+            # A rebound charger has lost its session current, allocate it again
+            self._inputs.pop(serial, None)
+            self._allocation.pop(serial, None)
+            twc_device.set_setpoint_current(self._devices[serial].get_setpoint_current())
+
+        @callback
+        def device_updated():
+            self._async_device_updated(serial)
+
+        self._devices[serial] = twc_device
+        self._callbacks[serial] = async_time_callbacks(self._hass, self._entry, {
+            Commands.TWC_STATUS.name: device_updated,
+            Commands.TWC_METER.name: device_updated,
+        })
+        twc_device.register_device_data_updated_callback(self._callbacks[serial])
+        # The charger may negotiate before it is allocated
+        self._async_cap_setpoints()
+        self._async_device_updated(serial)
+
+    def _priority(self, serial):
+        return self._charger_options.get(serial, {}).get(CONF_PRIORITY, DEFAULT_PRIORITY)
+
+    def _min_current(self, serial):
+        return int(self._charger_options.get(serial, {}).get(CONF_MIN_CURRENT, DEFAULT_MIN_CURRENT) * 100)
+
+    @staticmethod
+    def _is_active(twc_device: TWCPeripheral):
+        charge_state = twc_device.get_device_data().get("charge_state", None)
+        return charge_state is not None and charge_state not in INACTIVE_STATES
+
+    @callback
+    def _async_device_updated(self, serial):
+        twc_device = self._devices[serial]
+
+        if twc_device.get_setpoint_current() != self._setpoints.get(serial):
+            self._async_cap_setpoints()
+
+        inputs = (self._is_active(twc_device), twc_device.get_max_current())
+
+        if self._inputs.get(serial) == inputs:
+            return
+
+        self._inputs[serial] = inputs
+        self._async_schedule()
+
+    @callback
+    def _async_schedule(self):
+        if self._unsub_balance:
+            return
+
+        now = time.monotonic()
+
+        if self._last_balance is None or now - self._last_balance >= BALANCE_INTERVAL:
+            self._async_balance()
+        else:
+            self._unsub_balance = async_call_later(self._hass, BALANCE_INTERVAL - (now - self._last_balance),
+                                                   self._async_balance_later)
+
+    @callback
+    def _async_balance_later(self, now=None):
+        self._unsub_balance = None
+        self._async_balance()
+
+    def _budget(self):
+        if self._available_current is not None:
+            return min(self._shared_max_current, self._available_current)
+
+        return self._shared_max_current
+
+    def allocate(self):
+        """Return the current in 100ths of an amp allocated to each charger."""
+        budget = self._budget()
+        allocation = {serial: 0 for serial in self._devices}
+        active = sorted((serial for serial, inputs in self._inputs.items() if inputs[0]),
+                        key=lambda serial: -self._priority(serial))
+        granted = []
+
+        for serial in active:
+            minimum = min(self._min_current(serial), self._devices[serial].get_max_current())
+
+            if minimum <= budget:
+                allocation[serial] = minimum
+                budget -= minimum
+                granted.append(serial)
+
+        for _, group in groupby(granted, key=self._priority):
+            open_chargers = list(group)
+
+            while open_chargers and budget >= CURRENT_STEP:
+                share = max(CURRENT_STEP, (budget // len(open_chargers)) // CURRENT_STEP * CURRENT_STEP)
+
+                for serial in open_chargers:
+                    headroom = self._devices[serial].get_max_current() - allocation[serial]
+                    increase = min(share, headroom, budget) // CURRENT_STEP * CURRENT_STEP
+                    allocation[serial] += increase
+                    budget -= increase
+
+                open_chargers = [serial for serial in open_chargers
+                                 if self._devices[serial].get_max_current() - allocation[serial] >= CURRENT_STEP]
+
+        return allocation
+
+    @callback
+    def _async_balance(self):
+        self._last_balance = time.monotonic()
+        self._balance_count += 1
+        allocation = self.allocate()
+
+        decreases = {}
+        increases = {}
+
+        for serial, current in allocation.items():
+            previous = self._allocation.get(serial, 0)
+
+            if current < previous:
+                decreases[serial] = current
+            elif current > previous:
+                increases[serial] = current
+
+        self._allocation = allocation
+        self._async_cap_setpoints()
+
+        if not decreases and not increases:
+            return
+
+        self._send_task = self._hass.async_create_task(self._async_send(self._send_task, decreases, increases))
+
+    @callback
+    def _async_cap_setpoints(self):
+        """Cap the setpoint current the controller offers a negotiating charger by its share of the shared limit."""
+        idle = [serial for serial in self._devices if not self._inputs.get(serial, (False,))[0]]
+        spare = max(0, self._budget() - sum(self._allocation.get(serial, 0) for serial in self._devices
+                                            if serial not in idle))
+        idle_share = spare // len(idle) // CURRENT_STEP * CURRENT_STEP if idle else 0
+
+        for serial, twc_device in self._devices.items():
+            setpoint = twc_device.get_setpoint_current()
+
+            # Not capped yet, or set again through the default current entity
+            if setpoint != self._setpoints.get(serial):
+                self._default_setpoints[serial] = setpoint
+
+            capped = min(self._default_setpoints[serial],
+                         idle_share if serial in idle else self._allocation.get(serial, 0))
+            twc_device.set_setpoint_current(capped)
+            self._setpoints[serial] = twc_device.get_setpoint_current()
+
+    async def _async_send(self, previous_task, decreases, increases):
+        """Queue every decrease for the bus before any increase so the shared limit holds while they land."""
+        # The commands of the previous allocation are queued first, in the order they were allocated
+        if previous_task:
+            await asyncio.gather(previous_task, return_exceptions=True)
+
+        await asyncio.gather(*[self._async_send_current(serial, current) for serial, current in decreases.items()])
+        await asyncio.gather(*[self._async_send_current(serial, current) for serial, current in increases.items()])
+
+    async def _async_send_current(self, serial, current):
+        _LOGGER.debug(f"Allocating {current} to {serial}")
+        pipeline = async_get_command_pipeline(self._hass, self._entry, self._devices[serial])
+        self._command_count += 1
+        await pipeline.async_send_session_current(current)
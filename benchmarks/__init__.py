@@ -0,0 +1 @@
+"""Benchmarks for the Tesla Wall Charger Director integration."""
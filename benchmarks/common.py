@@ -0,0 +1,100 @@
+"""Shared helpers for running the integration inside a bare Home Assistant instance."""
+import os
+import sys
+import tempfile
+import time
+
+from homeassistant import config_entries, loader
+from homeassistant.core import HomeAssistant, CoreState
+from homeassistant.helpers import device_registry, entity_registry
+
+DOMAIN = "twcdirector"
+INTEGRATION_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(samples, percentile):
+    if not samples:
+        return None
+
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(percentile / 100 * (len(samples) - 1))))]
+
+
+def make_config_dir():
+    """Return a temporary configuration directory with the integration linked into custom_components."""
+    config_dir = tempfile.mkdtemp(prefix=f"{DOMAIN}_bench_")
+    os.makedirs(os.path.join(config_dir, "custom_components"))
+    os.symlink(INTEGRATION_PATH, os.path.join(config_dir, "custom_components", DOMAIN))
+
+    if config_dir not in sys.path:
+        sys.path.insert(0, config_dir)
+
+    return config_dir
+
+
+async def async_start_hass(config_dir):
+    """Start a bare Home Assistant instance able to set up config entries."""
+    try:
+        hass = HomeAssistant(config_dir)
+    except TypeError:
+        hass = HomeAssistant()
+        hass.config.config_dir = config_dir
+
+    hass.config.skip_pip = True
+    hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+
+    await device_registry.async_load(hass)
+    await entity_registry.async_load(hass)
+
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    await hass.config_entries.async_initialize()
+    hass.state = CoreState.running
+
+    return hass
+
+
+async def async_add_entry(hass, interface, shared_max_current=3200):
+    """Create and set up a config entry through the config flow's manual step, return the entry."""
+    result = await hass.config_entries.flow.async_init(DOMAIN, context={"source": config_entries.SOURCE_USER})
+
+    # The machine's serial ports are offered first, selecting none of them leads to the manual step
+    if result["step_id"] == "user":
+        result = await hass.config_entries.flow.async_configure(result["flow_id"], {"rs485_interfaces": []})
+
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {"rs485_interface": interface, "shared_max_current": shared_max_current})
+    await hass.async_block_till_done()
+
+    if result["type"] != "create_entry":
+        raise RuntimeError(f"The config flow did not create an entry for {interface}: {result}")
+
+    return result["result"]
+
+
+def get_listener(hass, entry):
+    """Return the listener of the entry's first bus."""
+    return next(iter(hass.data[DOMAIN][entry.entry_id]["buses"].values()))["twc_listener"]
+
+
+class StateWriteRecorder:
+    """Count state writes and measure their delay from the last received frame."""
+    def __init__(self, hass):
+        self._hass = hass
+        self._async_set = hass.states.async_set
+        self.last_frame_time = None
+        self.writes = 0
+        self.latencies = []
+
+    def install(self):
+        def async_set(*args, **kwargs):
+            self.writes += 1
+
+            if self.last_frame_time is not None:
+                self.latencies.append(time.monotonic() - self.last_frame_time)
+
+            return self._async_set(*args, **kwargs)
+
+        self._hass.states.async_set = async_set
+
+    def frame_written(self, timestamp, frame):
+        self.last_frame_time = timestamp
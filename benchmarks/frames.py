@@ -0,0 +1,77 @@
+"""Build raw TWC frames as a peripheral would put them on the bus."""
+from twcdirector.protocol import TWCProtocol, Commands, MessageType, Markers, MarkerEscape
+
+# Data frames from second generation chargers carry a 15 byte payload
+PAYLOAD_SIZE = 15
+
+
+def _escape(data):
+    escaped = bytearray()
+
+    for byte in data:
+        if byte == Markers.START:
+            escaped += bytes([MarkerEscape.ESCAPE, MarkerEscape.ESCAPE_END])
+        elif byte == MarkerEscape.ESCAPE:
+            escaped += bytes([MarkerEscape.ESCAPE, MarkerEscape.ESCAPE_ESCAPE])
+        else:
+            escaped.append(byte)
+
+    return bytes(escaped)
+
+
+def build_frame(command: Commands, sender, payload, message_type=MessageType.TWC_DATA):
+    """Return a complete frame, start and end markers included."""
+    payload = bytearray(bytes(payload).ljust(PAYLOAD_SIZE, b"\x00"))
+    checksum = (command + (sender >> 8) + (sender & 0xFF) + sum(payload)) & 0xFF
+
+    # The checksum is not escaped on the bus, move it off the marker values using the padding
+    if checksum in (Markers.START, MarkerEscape.ESCAPE):
+        payload[-1] = 1
+        checksum = (checksum + 1) & 0xFF
+
+    return (bytes([Markers.START, message_type, command]) + sender.to_bytes(2, "big") + _escape(payload) +
+            bytes([checksum, Markers.END, Markers.END_TYPE]))
+
+
+def status_frame(sender, charge_state, current_available, current_delivered, controller=0xF00D):
+    data = TWCProtocol.StatusData(controller=controller, charge_state=charge_state,
+                                  current_available=current_available, current_delivered=current_delivered)
+    return build_frame(Commands.TWC_STATUS, sender, data)
+
+
+def meter_frame(sender, total_kwh, voltages, currents):
+    """voltages in volts and currents in amps for phases l1, l2 and l3."""
+    data = TWCProtocol.MeterData(total_kwh=total_kwh,
+                                 phase_l1_v=voltages[0], phase_l2_v=voltages[1], phase_l3_v=voltages[2],
+                                 phase_l1_i=int(currents[0] * 2), phase_l2_i=int(currents[1] * 2),
+                                 phase_l3_i=int(currents[2] * 2))
+    return build_frame(Commands.TWC_METER, sender, data)
+
+
+def version_frame(sender, version=(4, 5, 3, 2)):
+    data = TWCProtocol.VersionData(version_release=version[0], version_major=version[1],
+                                   version_minor=version[2], version_patch=version[3])
+    return build_frame(Commands.TWC_VERSION, sender, data)
+
+
+def _string_frame(command, sender, text):
+    data = TWCProtocol.SerialData()
+    for index, character in enumerate(text[:14]):
+        data.serial[index] = ord(character)
+    return build_frame(command, sender, data)
+
+
+def serial_frame(sender, serial):
+    return _string_frame(Commands.TWC_SERIAL, sender, serial)
+
+
+def vin_frames(sender, vin):
+    """Return the three VIN frames, an empty vin reports no car connected."""
+    return [_string_frame(Commands.TWC_VIN_HIGH, sender, vin[0:7]),
+            _string_frame(Commands.TWC_VIN_MID, sender, vin[7:14]),
+            _string_frame(Commands.TWC_VIN_LOW, sender, vin[14:])]
+
+
+def peripheral_frame(sender, session, current_available=3200):
+    data = TWCProtocol.PeripheralNegotiation(session=session, current_available=current_available)
+    return build_frame(Commands.TWC_PERIPHERAL, sender, data)
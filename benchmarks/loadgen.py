@@ -0,0 +1,257 @@
+"""Simulate many chargers on one bus and report how the integration scales.
+
+Usage: python -m benchmarks.loadgen [--chargers 1,4,16,64] [--duration S] [--rate HZ] [--memory]
+
+For each charger count a config entry is set up in a bare Home Assistant
+instance and that many synthetic peripherals introduce themselves, then
+report status and meter data at the given rate with a car connecting and
+disconnecting every --vin-period seconds. Frames are handed to the
+listener's process_message, everything from frame decoding through the
+discovery coordinator to the entity state writes is the real code path.
+
+The bus protocol allows for far fewer chargers than the larger counts,
+those exist to show where the per charger costs start to add up.
+"""
+import argparse
+import asyncio
+import os
+import time
+import tracemalloc
+import tty
+
+from twcdirector.device import TWCPeripheral
+from twcdirector.protocol import Status
+
+from . import frames
+from .common import (
+    DOMAIN,
+    StateWriteRecorder,
+    async_add_entry,
+    async_start_hass,
+    get_listener,
+    make_config_dir,
+    percentile,
+)
+
+FIRST_ADDRESS = 0x1000
+LAG_PROBE_INTERVAL = 0.01
+SETUP_TIMEOUT = 60
+
+
+class FanOutMeter:
+    """Time the device data callbacks run for every processed frame."""
+    def __init__(self):
+        self._process_callbacks = TWCPeripheral._process_callbacks
+        self.callbacks = 0
+        self.seconds = 0.0
+
+    def install(self):
+        meter = self
+        process_callbacks = self._process_callbacks
+
+        async def timed_process_callbacks(device, callback_name, callbacks):
+            started = time.perf_counter()
+            await process_callbacks(device, callback_name, callbacks)
+            meter.seconds += time.perf_counter() - started
+            meter.callbacks += len(callbacks)
+
+        TWCPeripheral._process_callbacks = timed_process_callbacks
+
+    def uninstall(self):
+        TWCPeripheral._process_callbacks = self._process_callbacks
+
+
+class LoopLagProbe:
+    """Measure how late the event loop wakes a sleeping task."""
+    def __init__(self, interval=LAG_PROBE_INTERVAL):
+        self._interval = interval
+        self._task = None
+        self.samples = []
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._probe())
+
+    def stop(self):
+        self._task.cancel()
+
+    async def _probe(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self._interval)
+            self.samples.append(time.monotonic() - started - self._interval)
+
+
+class SyntheticCharger:
+    """The frames of one simulated peripheral."""
+    def __init__(self, index):
+        self.address = FIRST_ADDRESS + index
+        self.serial = f"LG{index:08d}"
+        self.vin = f"5YJ3E7EB{index:09d}"
+        self.car_connected = False
+        self._index = index
+
+    def introduction(self):
+        return [frames.peripheral_frame(self.address, self._index & 0xFF),
+                frames.version_frame(self.address),
+                frames.serial_frame(self.address, self.serial)]
+
+    def toggle_car(self):
+        self.car_connected = not self.car_connected
+        return frames.vin_frames(self.address, self.vin if self.car_connected else "")
+
+    def report(self, tick):
+        current = (tick * 37 + self._index * 13) % 1600 + 600 if self.car_connected else 0
+        charge_state = Status.CHARGING if self.car_connected else Status.READY
+        return [frames.status_frame(self.address, charge_state, 3200, current),
+                frames.meter_frame(self.address, 1000 + tick // 60, (240, 240, 240), (current / 100,) * 3)]
+
+
+def open_bus():
+    """Return a pty for the listener to open, its transmitted frames are drained and discarded."""
+    master_fd, slave_fd = os.openpty()
+    tty.setraw(master_fd)
+    tty.setraw(slave_fd)
+
+    def drain():
+        try:
+            os.read(master_fd, 4096)
+        except OSError:
+            pass
+
+    asyncio.get_running_loop().add_reader(master_fd, drain)
+    return master_fd, slave_fd, os.ttyname(slave_fd)
+
+
+def close_bus(master_fd, slave_fd):
+    asyncio.get_running_loop().remove_reader(master_fd)
+    os.close(master_fd)
+    os.close(slave_fd)
+
+
+async def async_wait_for_devices(hass, entry, count):
+    discovery = hass.data[DOMAIN][entry.entry_id]["discovery"]
+    deadline = time.monotonic() + SETUP_TIMEOUT
+
+    while len(discovery.get_devices()) < count:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Only {len(discovery.get_devices())} of {count} chargers were discovered")
+        await asyncio.sleep(0.01)
+
+    await hass.async_block_till_done()
+
+
+async def async_run(charger_count, duration, rate, vin_period, trace_memory):
+    config_dir = make_config_dir()
+    master_fd, slave_fd, interface = open_bus()
+    hass = await async_start_hass(config_dir)
+
+    # /dev/ is prefixed to the interface name by the integration
+    entry = await async_add_entry(hass, interface[len("/dev/"):], shared_max_current=3200 * charger_count)
+    twc_listener = get_listener(hass, entry)
+    chargers = [SyntheticCharger(index) for index in range(charger_count)]
+    entities_before = len(hass.states.async_entity_ids())
+    result = {"chargers": charger_count}
+
+    if trace_memory:
+        tracemalloc.start()
+        memory_before = tracemalloc.get_traced_memory()[0]
+
+    started = time.perf_counter()
+
+    for charger in chargers:
+        for frame in charger.introduction():
+            await twc_listener.process_message(frame)
+
+    await async_wait_for_devices(hass, entry, charger_count)
+    result["creation"] = time.perf_counter() - started
+    result["entities"] = len(hass.states.async_entity_ids()) - entities_before
+
+    if trace_memory:
+        result["memory"] = (tracemalloc.get_traced_memory()[0] - memory_before) / charger_count
+        tracemalloc.stop()
+
+    recorder = StateWriteRecorder(hass)
+    recorder.install()
+    fan_out = FanOutMeter()
+    fan_out.install()
+    lag_probe = LoopLagProbe()
+    lag_probe.start()
+
+    frame_count = 0
+    tick = 0
+    period = 1 / rate
+    # Spread the chargers over each period the way a controller polls them in turn
+    spacing = period / charger_count
+    started = time.monotonic()
+
+    try:
+        while time.monotonic() - started < duration:
+            for index, charger in enumerate(chargers):
+                charger_frames = charger.report(tick)
+
+                if (tick * period + index * vin_period / charger_count) % vin_period < period:
+                    charger_frames += charger.toggle_car()
+
+                for frame in charger_frames:
+                    recorder.frame_written(time.monotonic(), frame)
+                    await twc_listener.process_message(frame)
+
+                frame_count += len(charger_frames)
+                await asyncio.sleep(max(0.0, started + tick * period + (index + 1) * spacing - time.monotonic()))
+
+            tick += 1
+
+        await hass.async_block_till_done()
+    finally:
+        lag_probe.stop()
+        fan_out.uninstall()
+
+    result["frames"] = frame_count / (time.monotonic() - started)
+    result["lag"] = [percentile(lag_probe.samples, value) for value in (50, 95, 100)]
+    result["callbacks"] = fan_out.callbacks / max(frame_count, 1)
+    result["fan_out"] = fan_out.seconds / max(frame_count, 1)
+    result["writes"] = recorder.writes / max(frame_count, 1)
+
+    await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_stop()
+    close_bus(master_fd, slave_fd)
+
+    return result
+
+
+def print_results(results):
+    print(f"{'chargers':>8} {'entities':>8} {'setup ms':>9} {'KiB/chg':>8} {'frames/s':>9} "
+          f"{'lag p50':>8} {'lag p95':>8} {'lag max':>8} {'cb/frame':>9} {'fan-out us':>11} {'writes/frame':>13}")
+
+    for result in results:
+        memory = f"{result['memory'] / 1024:8.1f}" if "memory" in result else f"{'-':>8}"
+        lag_p50, lag_p95, lag_max = (lag * 1000 if lag is not None else float("nan") for lag in result["lag"])
+        print(f"{result['chargers']:>8} {result['entities']:>8} {result['creation'] * 1000:>9.1f} {memory} "
+              f"{result['frames']:>9.1f} {lag_p50:>8.2f} {lag_p95:>8.2f} {lag_max:>8.2f} "
+              f"{result['callbacks']:>9.2f} {result['fan_out'] * 1e6:>11.1f} {result['writes']:>13.2f}")
+
+
+async def async_main(args):
+    results = []
+
+    for charger_count in args.chargers:
+        results.append(await async_run(charger_count, args.duration, args.rate, args.vin_period, args.memory))
+
+    print_results(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chargers", type=lambda value: [int(count) for count in value.split(",")],
+                        default=[1, 4, 16, 64], help="comma separated charger counts to run")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of steady state traffic per run")
+    parser.add_argument("--rate", type=float, default=1.0, help="status and meter reports per charger per second")
+    parser.add_argument("--vin-period", type=float, default=5.0, help="seconds between car connects and disconnects")
+    parser.add_argument("--memory", action="store_true", help="trace the memory allocated per charger, slows setup")
+    args = parser.parse_args()
+
+    asyncio.run(async_main(args))
+
+
+if __name__ == "__main__":
+    main()
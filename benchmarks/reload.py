@@ -0,0 +1,111 @@
+"""Reload the integration repeatedly and check nothing is left behind.
+
+Usage: python -m benchmarks.reload [--chargers N] [--reloads N]
+
+A config entry with synthetic chargers is set up in a bare Home Assistant
+instance and reloaded --reloads times. The reload time is reported, and
+after the entry is unloaded the running tasks, event bus listeners and
+open file descriptors are compared with those before it was set up. The
+exit status is 1 if anything was left behind.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from .common import (
+    async_add_entry,
+    async_start_hass,
+    get_listener,
+    make_config_dir,
+    percentile,
+)
+from .loadgen import (
+    SyntheticCharger,
+    async_wait_for_devices,
+    close_bus,
+    open_bus,
+)
+
+# Controller claims and car connected callbacks run as short lived tasks
+SETTLE_TIME = 1.5
+
+
+def open_fds():
+    return set(os.listdir("/proc/self/fd")) if os.path.isdir("/proc/self/fd") else set()
+
+
+def running_tasks():
+    return {task for task in asyncio.all_tasks() if task is not asyncio.current_task() and not task.done()}
+
+
+async def async_introduce(hass, entry, chargers):
+    twc_listener = get_listener(hass, entry)
+
+    for charger in chargers:
+        for frame in charger.introduction() + charger.report(0):
+            await twc_listener.process_message(frame)
+
+    await async_wait_for_devices(hass, entry, len(chargers))
+
+
+async def async_run(charger_count, reloads):
+    config_dir = make_config_dir()
+    master_fd, slave_fd, interface = open_bus()
+    hass = await async_start_hass(config_dir)
+    await hass.async_block_till_done()
+
+    tasks_before = running_tasks()
+    listeners_before = hass.bus.async_listeners()
+    fds_before = open_fds()
+
+    chargers = [SyntheticCharger(index) for index in range(charger_count)]
+    entry = await async_add_entry(hass, interface[len("/dev/"):])
+    await async_introduce(hass, entry, chargers)
+
+    reload_times = []
+
+    for _ in range(reloads):
+        started = time.perf_counter()
+        await hass.config_entries.async_reload(entry.entry_id)
+        await hass.async_block_till_done()
+        reload_times.append(time.perf_counter() - started)
+        await async_introduce(hass, entry, chargers)
+
+    await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    await asyncio.sleep(SETTLE_TIME)
+
+    leaked_tasks = running_tasks() - tasks_before
+    listeners_after = hass.bus.async_listeners()
+    leaked_listeners = {event: count - listeners_before.get(event, 0) for event, count in listeners_after.items()
+                        if count > listeners_before.get(event, 0)}
+    leaked_fds = open_fds() - fds_before
+
+    print(f"reloads              {reloads}")
+    print(f"reload p50           {percentile(reload_times, 50) * 1000:.0f} ms")
+    print(f"reload max           {max(reload_times) * 1000:.0f} ms")
+    print(f"tasks left           {len(leaked_tasks)}")
+    for task in leaked_tasks:
+        print(f"  {task.get_coro()}")
+    print(f"bus listeners left   {sum(leaked_listeners.values())} {leaked_listeners or ''}")
+    print(f"file handles left    {len(leaked_fds)}")
+
+    await hass.async_stop()
+    close_bus(master_fd, slave_fd)
+
+    return not (leaked_tasks or leaked_listeners or leaked_fds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chargers", type=int, default=2)
+    parser.add_argument("--reloads", type=int, default=10)
+    args = parser.parse_args()
+
+    sys.exit(0 if asyncio.run(async_run(args.chargers, args.reloads)) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Replay a bus capture into the integration and report per frame costs.
+
+Usage: python -m benchmarks.replay CAPTURE [--speed N]
+
+The capture is recorded with the "Capture bus traffic" integration option.
+Frames are played through a pseudo terminal into a config entry set up in
+a bare Home Assistant instance, no RS485 adapter is needed.
+"""
+import argparse
+import asyncio
+import time
+
+from .common import (
+    DOMAIN,
+    StateWriteRecorder,
+    async_add_entry,
+    async_start_hass,
+    make_config_dir,
+    percentile,
+)
+
+
+async def async_replay(capture_path, speed):
+    config_dir = make_config_dir()
+
+    from custom_components.twcdirector.capture import TWCReplayBus, read_capture
+
+    replay_bus = TWCReplayBus(read_capture(capture_path), speed=speed)
+    interface = replay_bus.open()
+
+    hass = await async_start_hass(config_dir)
+    recorder = StateWriteRecorder(hass)
+    recorder.install()
+    replay_bus.add_frame_observer(recorder.frame_written)
+
+    # /dev/ is prefixed to the interface name by the integration
+    entry = await async_add_entry(hass, interface[len("/dev/"):])
+
+    thread_time = time.thread_time()
+    started = time.monotonic()
+    frames = await replay_bus.play()
+    await asyncio.sleep(1)
+    await hass.async_block_till_done()
+    elapsed = time.monotonic() - started
+    loop_time = time.thread_time() - thread_time
+
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    dispatchers = entry_data.get("dispatchers", {}).values()
+
+    print(f"frames                     {frames}")
+    print(f"replay time                {elapsed:.2f} s")
+    print(f"event loop time per frame  {loop_time / max(frames, 1) * 1e6:.0f} us")
+    print(f"entity writes per frame    {recorder.writes / max(frames, 1):.2f}")
+    print(f"dispatcher skipped writes  {sum(dispatcher.skipped_count for dispatcher in dispatchers)}")
+
+    for label, value in (("p50", 50), ("p95", 95), ("max", 100)):
+        latency = percentile(recorder.latencies, value)
+        if latency is not None:
+            print(f"frame to state {label}         {latency * 1000:.1f} ms")
+
+    await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_stop()
+    replay_bus.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("capture")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed, 0 plays frames back to back")
+    args = parser.parse_args()
+
+    asyncio.run(async_replay(args.capture, args.speed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Measure what the integration costs Home Assistant at startup.
+
+Usage: python -m benchmarks.startup [--chargers N] [--imports N] [--setups N]
+
+The integration and its config flow are imported --imports times, each in
+a fresh interpreter that has already imported Home Assistant, and the
+median import time is reported along with the twc-director and aioserial
+modules the import loaded. A config entry with synthetic chargers is then
+set up in a bare Home Assistant instance, the first set up pays for the
+deferred imports, and is unloaded and set up again --setups times.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from .common import (
+    DOMAIN,
+    async_add_entry,
+    async_start_hass,
+    get_listener,
+    make_config_dir,
+    percentile,
+)
+from .loadgen import (
+    SyntheticCharger,
+    async_wait_for_devices,
+    close_bus,
+    open_bus,
+)
+
+HEAVY_MODULES = ("twcdirector", "aioserial", "serial")
+
+IMPORT_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, sys.argv[1])
+import homeassistant.core, homeassistant.config_entries
+before = set(sys.modules)
+started = time.perf_counter()
+import importlib
+importlib.import_module(sys.argv[2])
+elapsed = time.perf_counter() - started
+loaded = sorted(name for name in set(sys.modules) - before if name.split(".")[0] in sys.argv[3:])
+print(json.dumps({"elapsed": elapsed, "loaded": loaded}))
+"""
+
+
+def time_import(config_dir, module, repeats):
+    """Return the median time to import module in a fresh interpreter and the heavy modules it loaded."""
+    samples = []
+    loaded = []
+
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_SCRIPT, config_dir, module, *HEAVY_MODULES],
+            check=True, capture_output=True, text=True).stdout
+        result = json.loads(output)
+        samples.append(result["elapsed"])
+        loaded = result["loaded"]
+
+    return statistics.median(samples), loaded
+
+
+async def async_set_up(hass, entry, chargers):
+    twc_listener = get_listener(hass, entry)
+
+    for charger in chargers:
+        for frame in charger.introduction() + charger.report(0):
+            await twc_listener.process_message(frame)
+
+    await async_wait_for_devices(hass, entry, len(chargers))
+    await hass.async_block_till_done()
+
+
+async def async_run(charger_count, setups):
+    config_dir = make_config_dir()
+    master_fd, slave_fd, interface = open_bus()
+    hass = await async_start_hass(config_dir)
+    await hass.async_block_till_done()
+
+    chargers = [SyntheticCharger(index) for index in range(charger_count)]
+
+    started = time.perf_counter()
+    entry = await async_add_entry(hass, interface[len("/dev/"):])
+    await async_set_up(hass, entry, chargers)
+    first_setup = time.perf_counter() - started
+
+    setup_times = []
+
+    for _ in range(setups):
+        await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+
+        started = time.perf_counter()
+        await hass.config_entries.async_setup(entry.entry_id)
+        await async_set_up(hass, entry, chargers)
+        setup_times.append(time.perf_counter() - started)
+
+    await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_stop()
+    close_bus(master_fd, slave_fd)
+
+    return first_setup, setup_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chargers", type=int, default=2)
+    parser.add_argument("--imports", type=int, default=5)
+    parser.add_argument("--setups", type=int, default=5)
+    args = parser.parse_args()
+
+    config_dir = make_config_dir()
+
+    for module in (f"custom_components.{DOMAIN}", f"custom_components.{DOMAIN}.config_flow"):
+        elapsed, loaded = time_import(config_dir, module, args.imports)
+        print(f"import {module:<40} {elapsed * 1000:.1f} ms")
+        print(f"  heavy modules loaded {len(loaded)} {' '.join(loaded)}")
+
+    first_setup, setup_times = asyncio.run(async_run(args.chargers, args.setups))
+
+    print(f"first setup          {first_setup * 1000:.0f} ms")
+    if setup_times:
+        print(f"setup p50            {percentile(setup_times, 50) * 1000:.0f} ms")
+        print(f"setup max            {max(setup_times) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
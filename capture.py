@@ -0,0 +1,264 @@
+"""The Tesla Wall Charger Director integration."""
+import asyncio
+import logging
+import os
+import struct
+import time
+import tty
+from datetime import datetime, timedelta
+
+from twcdirector.protocol import Commands
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+
+from .listener import (
+    DIRECTION_RECEIVE,
+    DIRECTION_TRANSMIT
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# A capture file is the header followed by one record per frame:
+# seconds since the capture started (float64), direction (uint8), frame length (uint16), frame
+CAPTURE_MAGIC = b"TWCCAP"
+CAPTURE_VERSION = 1
+CAPTURE_HEADER = struct.Struct("<6sB")
+CAPTURE_RECORD = struct.Struct("<dBH")
+FLUSH_INTERVAL = timedelta(seconds=10)
+
+# A traffic recorder slot is the record header followed by the frame, truncated to MAX_FRAME_SIZE
+MAX_FRAME_SIZE = 48
+TRAFFIC_SLOT_SIZE = CAPTURE_RECORD.size + MAX_FRAME_SIZE
+DIRECTION_NAMES = {DIRECTION_RECEIVE: "receive", DIRECTION_TRANSMIT: "transmit"}
+
+_COMMAND_NAMES = {command.value: command.name for command in Commands}
+
+
+def read_capture(path):
+    """Return the (timestamp, direction, frame) records of a capture file."""
+    with open(path, "rb") as capture_file:
+        data = capture_file.read()
+
+    magic, version = CAPTURE_HEADER.unpack_from(data, 0)
+
+    if magic != CAPTURE_MAGIC or version != CAPTURE_VERSION:
+        raise ValueError(f"{path} is not a version {CAPTURE_VERSION} frame capture")
+
+    records = []
+    offset = CAPTURE_HEADER.size
+
+    while offset + CAPTURE_RECORD.size <= len(data):
+        timestamp, direction, length = CAPTURE_RECORD.unpack_from(data, offset)
+        offset += CAPTURE_RECORD.size
+        records.append((timestamp, direction, bytes(data[offset:offset + length])))
+        offset += length
+
+    return records
+
+
+class TWCFrameCapture:
+    """Record the raw bus traffic of a listener to a capture file.
+
+    Frames are appended to an in-memory buffer by the frame observer and
+    written to the file from the executor every FLUSH_INTERVAL.
+    """
+    def __init__(self, hass: HomeAssistant, path):
+        self._hass = hass
+        self._path = path
+        self._buffer = bytearray()
+        self._started = None
+        self._remove_observer = None
+        self._unsub_flush = None
+        self._frame_count = 0
+
+    @property
+    def frame_count(self):
+        return self._frame_count
+
+    async def async_start(self, twc_listener):
+        await self._hass.async_add_executor_job(self._write_header)
+        self._started = time.monotonic()
+        self._remove_observer = twc_listener.add_frame_observer(self._frame_observer)
+        self._unsub_flush = async_track_time_interval(self._hass, self._async_flush, FLUSH_INTERVAL)
+        _LOGGER.info(f"Capturing bus traffic to {self._path}")
+
+    def bind_listener(self, twc_listener):
+        if self._remove_observer:
+            self._remove_observer()
+            self._remove_observer = twc_listener.add_frame_observer(self._frame_observer)
+
+    async def async_stop(self):
+        if self._remove_observer:
+            self._remove_observer()
+            self._remove_observer = None
+
+        if self._unsub_flush:
+            self._unsub_flush()
+            self._unsub_flush = None
+
+        await self._hass.async_add_executor_job(self._append, self._take_buffer())
+
+    def _frame_observer(self, direction, timestamp, frame):
+        self._buffer += CAPTURE_RECORD.pack(timestamp - self._started, direction, len(frame))
+        self._buffer += frame
+        self._frame_count += 1
+
+    def _take_buffer(self):
+        buffer = self._buffer
+        self._buffer = bytearray()
+        return buffer
+
+    @callback
+    def _async_flush(self, now=None):
+        if self._buffer:
+            self._hass.async_add_executor_job(self._append, self._take_buffer())
+
+    def _write_header(self):
+        with open(self._path, "wb") as capture_file:
+            capture_file.write(CAPTURE_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION))
+
+    def _append(self, buffer):
+        with open(self._path, "ab") as capture_file:
+            capture_file.write(buffer)
+
+
+class TWCTrafficRecorder:
+    """Keep the last frames seen on the bus in a fixed size ring buffer.
+
+    The buffer is allocated once, capacity slots of TRAFFIC_SLOT_SIZE
+    bytes, and every frame is packed into the next slot in place so the
+    recorder can be left running. Frames are only decoded when the buffer
+    is read.
+    """
+    def __init__(self, capacity):
+        self._capacity = capacity
+        self._buffer = bytearray(capacity * TRAFFIC_SLOT_SIZE)
+        self._next = 0
+        self._count = 0
+        self._started = time.monotonic()
+        self._started_wall = time.time()
+        self._remove_observer = None
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def memory_size(self):
+        return len(self._buffer)
+
+    def start(self, twc_listener):
+        self._remove_observer = twc_listener.add_frame_observer(self._frame_observer)
+
+    def stop(self):
+        if self._remove_observer:
+            self._remove_observer()
+            self._remove_observer = None
+
+    def bind_listener(self, twc_listener):
+        self.stop()
+        self.start(twc_listener)
+
+    def _frame_observer(self, direction, timestamp, frame):
+        length = min(len(frame), MAX_FRAME_SIZE)
+        offset = self._next * TRAFFIC_SLOT_SIZE
+        CAPTURE_RECORD.pack_into(self._buffer, offset, timestamp - self._started, direction, length)
+        offset += CAPTURE_RECORD.size
+        # The slot is written in place, length is already capped to the slot
+        self._buffer[offset:offset + length] = frame if length == len(frame) else frame[:length]
+
+        self._next = (self._next + 1) % self._capacity
+        self._count = min(self._count + 1, self._capacity)
+
+    def records(self):
+        """Return the recorded frames, oldest first, with their direction, time and command decoded."""
+        records = []
+        first = (self._next - self._count) % self._capacity
+
+        for index in range(self._count):
+            offset = ((first + index) % self._capacity) * TRAFFIC_SLOT_SIZE
+            timestamp, direction, length = CAPTURE_RECORD.unpack_from(self._buffer, offset)
+            frame = bytes(self._buffer[offset + CAPTURE_RECORD.size:offset + CAPTURE_RECORD.size + length])
+            command = frame[2] if len(frame) > 2 else None
+
+            records.append({
+                "time": datetime.fromtimestamp(self._started_wall + timestamp).isoformat(timespec="milliseconds"),
+                "direction": DIRECTION_NAMES.get(direction, direction),
+                "command": _COMMAND_NAMES.get(command, f"0x{command:02X}" if command is not None else None),
+                "sender": f"{frame[3]:02x}{frame[4]:02x}" if len(frame) > 4 else None,
+                "frame": frame.hex(),
+            })
+
+        return records
+
+
+class TWCReplayBus:
+    """Play a capture back through a pseudo terminal standing in for the RS485 interface.
+
+    Received frames are written to the pty at their captured times divided
+    by speed, or back to back when speed is 0. Frames the listener transmits
+    are read from the pty and handed to transmit_observer if one is set.
+    """
+    def __init__(self, records, speed=1.0, transmit_observer=None):
+        self._records = [record for record in records if record[1] == DIRECTION_RECEIVE]
+        self._speed = speed
+        self._transmit_observer = transmit_observer
+        self._master_fd = None
+        self._slave_fd = None
+        self._loop = None
+        self._frame_observers = []
+
+    def open(self):
+        """Open the pty and return the path the listener should open."""
+        self._master_fd, self._slave_fd = os.openpty()
+        tty.setraw(self._master_fd)
+        tty.setraw(self._slave_fd)
+        return os.ttyname(self._slave_fd)
+
+    def add_frame_observer(self, frame_observer):
+        """Call frame_observer(timestamp, frame) as each frame is written."""
+        self._frame_observers.append(frame_observer)
+
+    async def play(self):
+        """Write every received frame to the pty, return the number of frames written."""
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self._master_fd, self._read_transmitted)
+        started = time.monotonic()
+
+        try:
+            for timestamp, _, frame in self._records:
+                if self._speed:
+                    delay = started + timestamp / self._speed - time.monotonic()
+
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                else:
+                    # Yield so the listener keeps up with the frames
+                    await asyncio.sleep(0)
+
+                os.write(self._master_fd, frame)
+
+                for frame_observer in self._frame_observers:
+                    frame_observer(time.monotonic(), frame)
+        finally:
+            self._loop.remove_reader(self._master_fd)
+
+        return len(self._records)
+
+    def _read_transmitted(self):
+        try:
+            data = os.read(self._master_fd, 1024)
+        except OSError:
+            return
+
+        if self._transmit_observer:
+            self._transmit_observer(time.monotonic(), data)
+
+    def close(self):
+        for fd in (self._master_fd, self._slave_fd):
+            if fd is not None:
+                os.close(fd)
+
+        self._master_fd = None
+        self._slave_fd = None
@@ -0,0 +1,373 @@
+"""The Tesla Wall Charger Director integration."""
+import asyncio
+import logging
+import time
+from collections import deque
+
+from twcdirector.device import TWCPeripheral, TWCController
+from twcdirector.protocol import Commands, Status
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.config_entries import ConfigEntry
+
+from .health import async_time_callbacks
+from .const import (
+    DOMAIN,
+    CONF_COMMAND_DEBOUNCE,
+    DEFAULT_COMMAND_DEBOUNCE
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+ACK_TIMEOUT = 5
+ACK_RETRIES = 2
+# Allow for the charger rounding the applied current
+ACK_TOLERANCE = 50
+LATENCY_SAMPLES = 100
+
+
+class TWCLatencyStats:
+    """Rolling command to confirmation latency samples in seconds."""
+    def __init__(self, samples=LATENCY_SAMPLES):
+        self._samples = deque(maxlen=samples)
+        self._last = None
+
+    def record(self, latency):
+        self._last = latency
+        self._samples.append(latency)
+
+    @property
+    def last(self):
+        return self._last
+
+    @property
+    def count(self):
+        return len(self._samples)
+
+    def percentile(self, percentile):
+        if not self._samples:
+            return None
+
+        samples = sorted(self._samples)
+        index = min(len(samples) - 1, int(round(percentile / 100 * (len(samples) - 1))))
+        return samples[index]
+
+
+class TWCCommandPipeline:
+    """Per charger pipeline for session current commands.
+
+    Only the latest requested setpoint is kept, a setpoint that arrives
+    before the previous one was sent supersedes it. Requests are sent after
+    the debounce window has passed without a newer one, contactor commands
+    are only sent when the contactors have to change state.
+
+    Every sent setpoint is tracked until a status frame reports it as the
+    available current. An unconfirmed setpoint is resent up to ACK_RETRIES
+    times, ACK_TIMEOUT seconds apart. The default current is confirmed the
+    same way when the charger negotiates a new session with it.
+
+    async_send_session_current() skips the debounce and returns once the
+    commands are queued for the bus, so a batch can order the commands of
+    several chargers.
+    """
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, twc_device: TWCPeripheral, debounce=DEFAULT_COMMAND_DEBOUNCE):
+        self._hass = hass
+        self._entry = entry
+        self._twc_device: TWCPeripheral = twc_device
+        self._debounce = debounce
+        self._pending_current = None
+        self._immediate = False
+        self._sent_waiters = []
+        self._last_current = None
+        self._contactors_closed = None
+        self._wake = asyncio.Event()
+        self._confirmed = asyncio.Event()
+        self._confirm_target = None
+        self._last_charge_state = None
+        self._task = None
+        self._initial_task = None
+        self._sent_count = 0
+        self._dropped_count = 0
+        self._retry_count = 0
+        self._timeout_count = 0
+        self._latency = TWCLatencyStats()
+        self._listeners = []
+        self._callbacks = async_time_callbacks(hass, entry, {
+            Commands.TWC_STATUS.name: self._async_status_updated,
+        })
+
+    def start(self):
+        self._twc_device.register_device_data_updated_callback(self._callbacks)
+        self._task = self._hass.loop.create_task(self._process_commands())
+
+    async def async_stop(self):
+        self._twc_device.deregister_device_data_updated_callback(self._callbacks)
+        tasks = [task for task in (self._task, self._initial_task) if task]
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._initial_task = None
+        self._async_release_waiters(self._async_take_waiters())
+
+    def set_debounce(self, debounce):
+        self._debounce = debounce
+
+    @callback
+    def async_bind_device(self, twc_device: TWCPeripheral):
+        """Follow a new peripheral object for the same charger."""
+        self._twc_device.deregister_device_data_updated_callback(self._callbacks)
+        self._twc_device = twc_device
+        self._twc_device.register_device_data_updated_callback(self._callbacks)
+        # A restarted charger has lost its session current and contactor state
+        self._last_current = None
+        self._contactors_closed = None
+        self._last_charge_state = None
+
+    @callback
+    def async_add_listener(self, update_callback):
+        """Call update_callback when a confirmation latency is recorded."""
+        self._listeners.append(update_callback)
+
+        @callback
+        def remove_listener():
+            self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    @property
+    def queue_depth(self):
+        return 0 if self._pending_current is None else 1
+
+    @property
+    def sent_count(self):
+        return self._sent_count
+
+    @property
+    def dropped_count(self):
+        return self._dropped_count
+
+    @property
+    def retry_count(self):
+        return self._retry_count
+
+    @property
+    def timeout_count(self):
+        return self._timeout_count
+
+    @property
+    def latency(self):
+        return self._latency
+
+    @callback
+    def async_set_session_current(self, current):
+        """Request a session current in 100ths of an amp, 0 opens the contactors."""
+        if self._pending_current is not None:
+            self._dropped_count += 1
+
+        self._pending_current = current
+        self._wake.set()
+
+    async def async_send_session_current(self, current):
+        """Send a session current without the debounce, return once its commands are queued for the bus."""
+        waiter = self._hass.loop.create_future()
+        self._sent_waiters.append(waiter)
+        self._immediate = True
+        self.async_set_session_current(current)
+        await waiter
+
+    @callback
+    def _async_take_waiters(self):
+        waiters = self._sent_waiters
+        self._sent_waiters = []
+        return waiters
+
+    @callback
+    def _async_release_waiters(self, waiters):
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _get_listener(self):
+        return self._hass.data[DOMAIN][self._entry.entry_id]["supervisor"].listener_for(self._twc_device)
+
+    @callback
+    def _async_check_confirmed(self):
+        if (self._confirm_target is not None and
+                abs(self._twc_device.get_status_current_available() - self._confirm_target) <= ACK_TOLERANCE):
+            self._confirmed.set()
+
+    @callback
+    def _async_status_updated(self):
+        charge_state = self._twc_device.get_device_data().get("charge_state", None)
+        self._async_check_confirmed()
+
+        if charge_state == Status.NEGOTIATING and self._last_charge_state != Status.NEGOTIATING:
+            # The controller answers a negotiation with the default current as the initial current
+            if self._confirm_target is None and (self._initial_task is None or self._initial_task.done()):
+                self._initial_task = self._hass.async_create_task(self._confirm_initial_current())
+
+        self._last_charge_state = charge_state
+
+    async def _process_commands(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+
+            if self._debounce and not self._immediate:
+                await asyncio.sleep(self._debounce)
+
+                # Keep waiting while newer setpoints keep arriving
+                while self._wake.is_set() and not self._immediate:
+                    self._wake.clear()
+                    await asyncio.sleep(self._debounce)
+
+            current = self._pending_current
+            self._pending_current = None
+            self._immediate = False
+            # Waiters added while this current is sent wait for their own current to be sent
+            waiters = self._async_take_waiters()
+
+            if current is None:
+                self._async_release_waiters(waiters)
+                continue
+
+            if self._initial_task and not self._initial_task.done():
+                self._initial_task.cancel()
+
+            try:
+                sent = await self._send_session_current(current)
+                self._async_release_waiters(waiters)
+
+                if sent:
+                    await self._confirm(current, lambda: self._resend_session_current(current))
+            except Exception as error:
+                _LOGGER.exception(f"Sending session current to {self._twc_device.get_address():04x} failed: {error}")
+            finally:
+                # Also when the pipeline is stopped while the current is sent
+                self._async_release_waiters(waiters)
+
+    async def _send_session_current(self, current):
+        """Send the commands for a session current, return True if a current was sent."""
+        twc_listener = self._get_listener()
+        twc_controller: TWCController = twc_listener.get_fake_controller() if twc_listener else None
+        address = self._twc_device.get_address()
+
+        if twc_controller is None:
+            _LOGGER.warning(f"Controller not running on the bus of {address:04x}, session current not sent")
+            return False
+
+        current_sent = False
+
+        if current == 0:
+            if self._contactors_closed is not False:
+                await twc_listener.async_run(twc_controller.queue_peripheral_open_contactors_command(address))
+                self._contactors_closed = False
+                self._sent_count += 1
+        else:
+            if self._contactors_closed is not True:
+                await twc_listener.async_run(twc_controller.queue_peripheral_close_contactors_command(address))
+                self._contactors_closed = True
+                self._sent_count += 1
+
+            if current != self._last_current:
+                await twc_listener.async_run(
+                    twc_controller.queue_peripheral_session_current_command(address, current))
+                self._sent_count += 1
+                current_sent = True
+
+        self._last_current = current
+        return current_sent
+
+    async def _resend_session_current(self, current):
+        twc_listener = self._get_listener()
+        # The charger's bus was reopened or its controller is not running yet, the retry waits for its status
+        twc_controller = twc_listener.get_fake_controller() if twc_listener else None
+
+        if twc_controller is None:
+            return
+
+        await twc_listener.async_run(
+            twc_controller.queue_peripheral_session_current_command(self._twc_device.get_address(), current))
+        self._sent_count += 1
+
+    async def _resend_initial_current(self, current):
+        twc_listener = self._get_listener()
+        twc_controller = twc_listener.get_fake_controller() if twc_listener else None
+
+        if twc_controller is None:
+            return
+
+        await twc_listener.async_run(
+            twc_controller.queue_peripheral_initial_current_command(self._twc_device.get_address(), current))
+        self._sent_count += 1
+
+    async def _confirm_initial_current(self):
+        current = self._twc_device.get_setpoint_current()
+        await self._confirm(current, lambda: self._resend_initial_current(current))
+
+    async def _confirm(self, current, resend):
+        """Wait for a status frame to confirm current, resending it on timeout."""
+        address = self._twc_device.get_address()
+        started = time.monotonic()
+        self._confirm_target = current
+        self._confirmed.clear()
+        # Confirmation may already be in the data when the charger was already at this current
+        self._async_check_confirmed()
+
+        try:
+            for attempt in range(ACK_RETRIES + 1):
+                if attempt:
+                    _LOGGER.debug(f"Retrying current {current} for {address:04x}, attempt {attempt}")
+                    self._retry_count += 1
+                    await resend()
+
+                confirmed, superseded = await self._wait_confirmed()
+
+                if superseded:
+                    return
+
+                if not confirmed:
+                    continue
+
+                self._latency.record(time.monotonic() - started)
+
+                for update_callback in list(self._listeners):
+                    update_callback()
+
+                return
+
+            self._timeout_count += 1
+            _LOGGER.warning(f"Current {current} for {address:04x} was not confirmed after {ACK_RETRIES} retries")
+        finally:
+            self._confirm_target = None
+
+    async def _wait_confirmed(self):
+        """Wait up to ACK_TIMEOUT for confirmation, return (confirmed, superseded by a newer setpoint)."""
+        confirmed = asyncio.ensure_future(self._confirmed.wait())
+        superseded = asyncio.ensure_future(self._wake.wait())
+
+        try:
+            await asyncio.wait({confirmed, superseded}, timeout=ACK_TIMEOUT, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            confirmed.cancel()
+            superseded.cancel()
+
+        return self._confirmed.is_set(), self._wake.is_set() and not self._confirmed.is_set()
+
+
+@callback
+def async_get_command_pipeline(hass: HomeAssistant, entry: ConfigEntry, twc_device: TWCPeripheral):
+    """Return the command pipeline for a charger, creating it on first use."""
+    pipelines = hass.data[DOMAIN][entry.entry_id].setdefault("pipelines", {})
+    pipeline = pipelines.get(twc_device.get_serial(), None)
+
+    if pipeline is None:
+        pipeline = TWCCommandPipeline(hass, entry, twc_device,
+                                      entry.options.get(CONF_COMMAND_DEBOUNCE, DEFAULT_COMMAND_DEBOUNCE))
+        pipeline.start()
+        pipelines[twc_device.get_serial()] = pipeline
+
+    return pipeline
@@ -1,59 +1,347 @@
 """Config flow for Tesla Wall Charger Director."""
 import logging
+import os
 
 import voluptuous as vol
 
 from homeassistant import config_entries
+from homeassistant.core import callback
+import homeassistant.helpers.config_validation as cv
 
 from .const import (
     DOMAIN,
     CONF_RS485_INTERFACE,
+    CONF_RS485_INTERFACES,
     CONF_SHARED_MAX_CURRENT,
+    DEFAULT_SHARED_MAX_CURRENT,
+    CONF_COMMAND_DEBOUNCE,
+    DEFAULT_COMMAND_DEBOUNCE,
+    CONF_LOAD_BALANCING,
+    CONF_SOLAR,
+    CONF_SOLAR_SENSOR,
+    CONF_SOLAR_VOLTAGE,
+    CONF_SOLAR_PHASES,
+    CONF_SOLAR_HYSTERESIS,
+    CONF_SOLAR_RAMP,
+    CONF_SOLAR_INTERVAL,
+    CONF_SOLAR_SUSTAIN,
+    DEFAULT_SOLAR_VOLTAGE,
+    DEFAULT_SOLAR_PHASES,
+    DEFAULT_SOLAR_HYSTERESIS,
+    DEFAULT_SOLAR_RAMP,
+    DEFAULT_SOLAR_INTERVAL,
+    DEFAULT_SOLAR_SUSTAIN,
+    CONF_CAPTURE,
+    CONF_LISTENER_THREAD,
+    CONF_TRAFFIC_BUFFER,
+    DEFAULT_TRAFFIC_BUFFER,
+    CONF_CHARGER,
+    CONF_CHARGERS,
+    CONF_PRIORITY,
+    CONF_MIN_CURRENT,
+    DEFAULT_PRIORITY,
+    DEFAULT_MIN_CURRENT,
+    CONF_SENSOR,
+    CONF_DEADBAND_ABSOLUTE,
+    CONF_DEADBAND_RELATIVE,
+    CONF_MIN_INTERVAL,
+    CONF_MAX_INTERVAL,
+    THROTTLE_SENSOR_TYPES,
 )
 
 _LOGGER = logging.getLogger(__name__)
 
+SENSOR_NONE = "none"
+CHARGER_NONE = "none"
+
 
 class TWCFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a Tesla Wall Charger Director config flow."""
 
-    VERSION = 1
+    VERSION = 2
     CONNECTION_CLASS = config_entries.CONN_CLASS_LOCAL_PUSH
 
     def __init__(self):
         """Initialize Tesla Wall Charger Director ConfigFlow."""
-        self.rs485_interface = "ttyUSB0"
-        self.shared_max_current = 3200
+        self.rs485_interfaces = []
+        self.shared_max_current = DEFAULT_SHARED_MAX_CURRENT
+        self.candidates = None
+        self.ports = None
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Get the options flow for this handler."""
+        return TWCOptionsFlowHandler(config_entry)
 
     async def async_step_user(self, user_input=None):
-        """Handle a flow initialized by the user."""
+        """Select the serial ports to listen to for chargers, none to enter a path."""
+        if self.candidates is None:
+            # Listing and opening the ports pulls in pyserial and twc-director, only import them once a flow runs
+            from .probe import async_list_ports
+
+            configured = [rs485_interface for entry in self._async_current_entries()
+                          for rs485_interface in entry.data.get(CONF_RS485_INTERFACES, [])]
+            self.candidates = await async_list_ports(self.hass, exclude=configured)
+
+        if not self.candidates:
+            return await self.async_step_manual()
+
         if user_input is not None:
-            if _device_already_added(self._async_current_entries(), user_input[CONF_RS485_INTERFACE]):
-                return self.async_abort(reason="already_configured")
+            selected = list(user_input[CONF_RS485_INTERFACES])
 
-            self.rs485_interface = user_input[CONF_RS485_INTERFACE]
-            return self.async_create_entry(
-                title=self.rs485_interface, data={CONF_RS485_INTERFACE: self.rs485_interface,
-                                                  CONF_SHARED_MAX_CURRENT: self.shared_max_current}
-            )
+            if not selected:
+                return await self.async_step_manual()
+
+            from .probe import async_probe_ports
+
+            self.ports = await async_probe_ports(self.hass, selected)
+
+            if not self.ports:
+                return await self.async_step_manual()
+
+            return await self.async_step_interfaces()
+
+        candidates = {path: f"{path} ({description})" if description and description != "n/a" else path
+                      for path, description in self.candidates.items()}
 
         return self.async_show_form(
             step_id="user",
             data_schema=vol.Schema(
                 {
-                    vol.Required(CONF_RS485_INTERFACE): vol.In(["ttyUSB0", "ttyUSB1", "ttySC0", "ttySC1"]),
-                    vol.Required(CONF_SHARED_MAX_CURRENT, default=3200): int,
+                    vol.Optional(CONF_RS485_INTERFACES, default=[]): cv.multi_select(candidates),
+                }
+            ),
+        )
+
+    async def async_step_interfaces(self, user_input=None):
+        """Offer the selected serial ports chargers were heard on."""
+        errors = {}
+
+        if user_input is not None:
+            self.rs485_interfaces = list(user_input[CONF_RS485_INTERFACES])
+            self.shared_max_current = user_input[CONF_SHARED_MAX_CURRENT]
+
+            if not self.rs485_interfaces:
+                errors["base"] = "no_interfaces"
+            else:
+                return await self._async_create_entry()
+
+        ports = {path: f"{path} ({count} {'charger' if count == 1 else 'chargers'})" for path, count in self.ports.items()}
+
+        return self.async_show_form(
+            step_id="interfaces",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_RS485_INTERFACES, default=self.rs485_interfaces or list(self.ports)):
+                        cv.multi_select(ports),
+                    vol.Required(CONF_SHARED_MAX_CURRENT, default=self.shared_max_current): int,
+                }
+            ),
+            errors=errors,
+        )
+
+    async def async_step_manual(self, user_input=None):
+        """Enter the path of an RS485 interface that was not listed or no chargers were heard on."""
+        errors = {}
+
+        if user_input is not None:
+            self.rs485_interfaces = [user_input[CONF_RS485_INTERFACE].strip()]
+            self.shared_max_current = user_input[CONF_SHARED_MAX_CURRENT]
+
+            from .probe import interface_path
+
+            if await self.hass.async_add_executor_job(os.path.exists, interface_path(self.rs485_interfaces[0])):
+                return await self._async_create_entry()
+
+            errors["base"] = "invalid_interface"
+        elif self.ports is not None:
+            # Arrived here because none of the selected ports had chargers on them
+            errors["base"] = "no_devices_found"
+
+        return self.async_show_form(
+            step_id="manual",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_RS485_INTERFACE,
+                                 default=self.rs485_interfaces[0] if self.rs485_interfaces else ""): str,
+                    vol.Required(CONF_SHARED_MAX_CURRENT, default=self.shared_max_current): int,
+                }
+            ),
+            errors=errors,
+        )
+
+    async def _async_create_entry(self):
+        current_entries = self._async_current_entries()
+
+        for rs485_interface in self.rs485_interfaces:
+            if await self.hass.async_add_executor_job(_device_already_added, current_entries, rs485_interface):
+                return self.async_abort(reason="already_configured")
+
+        # One entry shares the maximum current between the chargers on all of its buses
+        return self.async_create_entry(
+            title=", ".join(os.path.basename(path) for path in self.rs485_interfaces),
+            data={CONF_RS485_INTERFACES: self.rs485_interfaces, CONF_SHARED_MAX_CURRENT: self.shared_max_current}
+        )
+
+
+class TWCOptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle Tesla Wall Charger Director options."""
+
+    def __init__(self, config_entry):
+        """Initialize Tesla Wall Charger Director options flow."""
+        self.config_entry = config_entry
+        self.options = dict(config_entry.options)
+        self.charger = None
+        self.sensor = None
+        self.solar = False
+
+    def _known_chargers(self):
+        entry_data = self.hass.data.get(DOMAIN, {}).get(self.config_entry.entry_id, {})
+        discovery = entry_data.get("discovery", None)
+        return list(discovery.get_devices()) if discovery else []
+
+    async def _async_next_step(self):
+        if self.charger is not None:
+            return await self.async_step_charger()
+
+        if self.sensor is not None:
+            return await self.async_step_sensor()
+
+        if self.solar:
+            return await self.async_step_solar()
+
+        return self.async_create_entry(title="", data=self.options)
+
+    async def async_step_init(self, user_input=None):
+        """Configure the command pipeline and load balancing, select a charger or sensor to configure."""
+        if user_input is not None:
+            self.options[CONF_COMMAND_DEBOUNCE] = user_input[CONF_COMMAND_DEBOUNCE]
+            self.options[CONF_LOAD_BALANCING] = user_input[CONF_LOAD_BALANCING]
+            self.options[CONF_SOLAR] = user_input[CONF_SOLAR]
+            self.solar = user_input[CONF_SOLAR]
+            self.options[CONF_CAPTURE] = user_input[CONF_CAPTURE]
+            self.options[CONF_LISTENER_THREAD] = user_input[CONF_LISTENER_THREAD]
+            self.options[CONF_TRAFFIC_BUFFER] = user_input[CONF_TRAFFIC_BUFFER]
+
+            if user_input.get(CONF_CHARGER, CHARGER_NONE) != CHARGER_NONE:
+                self.charger = user_input[CONF_CHARGER]
+
+            if user_input.get(CONF_SENSOR, SENSOR_NONE) != SENSOR_NONE:
+                self.sensor = user_input[CONF_SENSOR]
+
+            return await self._async_next_step()
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(CONF_COMMAND_DEBOUNCE,
+                                 default=self.options.get(CONF_COMMAND_DEBOUNCE, DEFAULT_COMMAND_DEBOUNCE)):
+                        vol.All(vol.Coerce(float), vol.Range(min=0, max=10)),
+                    vol.Optional(CONF_LOAD_BALANCING, default=self.options.get(CONF_LOAD_BALANCING, False)): bool,
+                    vol.Optional(CONF_SOLAR, default=self.options.get(CONF_SOLAR, False)): bool,
+                    vol.Optional(CONF_CAPTURE, default=self.options.get(CONF_CAPTURE, False)): bool,
+                    vol.Optional(CONF_LISTENER_THREAD, default=self.options.get(CONF_LISTENER_THREAD, False)): bool,
+                    vol.Optional(CONF_TRAFFIC_BUFFER,
+                                 default=self.options.get(CONF_TRAFFIC_BUFFER, DEFAULT_TRAFFIC_BUFFER)):
+                        vol.All(vol.Coerce(int), vol.Range(min=0, max=20000)),
+                    vol.Optional(CONF_CHARGER, default=CHARGER_NONE): vol.In([CHARGER_NONE] + self._known_chargers()),
+                    vol.Optional(CONF_SENSOR, default=SENSOR_NONE): vol.In([SENSOR_NONE] + THROTTLE_SENSOR_TYPES),
+                }
+            ),
+        )
+
+    async def async_step_charger(self, user_input=None):
+        """Configure the load balancing priority and minimum current of a charger."""
+        if user_input is not None:
+            chargers = dict(self.options.get(CONF_CHARGERS, {}))
+            chargers[self.charger] = user_input
+            self.options[CONF_CHARGERS] = chargers
+            self.charger = None
+            return await self._async_next_step()
+
+        charger_options = self.options.get(CONF_CHARGERS, {}).get(self.charger, {})
+
+        return self.async_show_form(
+            step_id="charger",
+            description_placeholders={CONF_CHARGER: self.charger},
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(CONF_PRIORITY, default=charger_options.get(CONF_PRIORITY, DEFAULT_PRIORITY)):
+                        vol.Coerce(int),
+                    vol.Optional(CONF_MIN_CURRENT, default=charger_options.get(CONF_MIN_CURRENT, DEFAULT_MIN_CURRENT)):
+                        vol.All(vol.Coerce(float), vol.Range(min=0, max=80)),
+                }
+            ),
+        )
+
+    async def async_step_solar(self, user_input=None):
+        """Configure the power sensor and control loop followed by the solar follow mode."""
+        if user_input is not None:
+            self.options.update(user_input)
+            self.solar = False
+            return await self._async_next_step()
+
+        return self.async_show_form(
+            step_id="solar",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_SOLAR_SENSOR, default=self.options.get(CONF_SOLAR_SENSOR, "")): str,
+                    vol.Optional(CONF_SOLAR_VOLTAGE, default=self.options.get(CONF_SOLAR_VOLTAGE, DEFAULT_SOLAR_VOLTAGE)):
+                        vol.All(vol.Coerce(float), vol.Range(min=100, max=480)),
+                    vol.Optional(CONF_SOLAR_PHASES, default=self.options.get(CONF_SOLAR_PHASES, DEFAULT_SOLAR_PHASES)):
+                        vol.In([1, 3]),
+                    vol.Optional(CONF_SOLAR_HYSTERESIS,
+                                 default=self.options.get(CONF_SOLAR_HYSTERESIS, DEFAULT_SOLAR_HYSTERESIS)):
+                        vol.All(vol.Coerce(float), vol.Range(min=0, max=10)),
+                    vol.Optional(CONF_SOLAR_RAMP, default=self.options.get(CONF_SOLAR_RAMP, DEFAULT_SOLAR_RAMP)):
+                        vol.All(vol.Coerce(float), vol.Range(min=0.1, max=80)),
+                    vol.Optional(CONF_SOLAR_INTERVAL,
+                                 default=self.options.get(CONF_SOLAR_INTERVAL, DEFAULT_SOLAR_INTERVAL)):
+                        vol.All(vol.Coerce(float), vol.Range(min=1, max=300)),
+                    vol.Optional(CONF_SOLAR_SUSTAIN, default=self.options.get(CONF_SOLAR_SUSTAIN, DEFAULT_SOLAR_SUSTAIN)):
+                        vol.All(vol.Coerce(float), vol.Range(min=0, max=3600)),
+                }
+            ),
+        )
+
+    async def async_step_sensor(self, user_input=None):
+        """Configure the deadband and publish intervals of a sensor."""
+        if user_input is not None:
+            self.options[self.sensor] = user_input
+            self.sensor = None
+            return await self._async_next_step()
+
+        sensor_options = self.options.get(self.sensor, {})
+
+        return self.async_show_form(
+            step_id="sensor",
+            description_placeholders={CONF_SENSOR: self.sensor},
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(CONF_DEADBAND_ABSOLUTE, default=sensor_options.get(CONF_DEADBAND_ABSOLUTE, 0)):
+                        vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Optional(CONF_DEADBAND_RELATIVE, default=sensor_options.get(CONF_DEADBAND_RELATIVE, 0)):
+                        vol.All(vol.Coerce(float), vol.Range(min=0, max=1)),
+                    vol.Optional(CONF_MIN_INTERVAL, default=sensor_options.get(CONF_MIN_INTERVAL, 0)):
+                        vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Optional(CONF_MAX_INTERVAL, default=sensor_options.get(CONF_MAX_INTERVAL, 0)):
+                        vol.All(vol.Coerce(float), vol.Range(min=0)),
                 }
             ),
         )
 
 
 def _device_already_added(current_entries, rs485_interface):
-    """Determine if entry has already been added to HA."""
-    for entry in current_entries:
-        entry_rs485_interface = entry.data.get(CONF_RS485_INTERFACE)
+    """Determine if an entry already manages the interface, under this or any other path of the same device."""
+    from .probe import interface_path
 
-        if entry_rs485_interface == rs485_interface:
+    device = os.path.realpath(interface_path(rs485_interface))
+
+    for entry in current_entries:
+        if any(os.path.realpath(interface_path(interface)) == device
+               for interface in entry.data.get(CONF_RS485_INTERFACES, [])):
             return True
 
     return False
@@ -3,11 +3,64 @@
 DOMAIN = "twcdirector"
 DEFAULT_NAME = "Home Automation Industries"
 
+# Version 1 entries held a single interface
 CONF_RS485_INTERFACE = "rs485_interface"
+CONF_RS485_INTERFACES = "rs485_interfaces"
 CONF_SHARED_MAX_CURRENT = "shared_max_current"
+DEFAULT_SHARED_MAX_CURRENT = 3200
 
 CONF_SCALE = "scale"
 CONF_ROUND = "round"
 CONF_FORMAT = "format"
 
+CONF_COMMAND_DEBOUNCE = "command_debounce"
+DEFAULT_COMMAND_DEBOUNCE = 0.5
+
+CONF_LOAD_BALANCING = "load_balancing"
+CONF_CHARGER = "charger"
+CONF_CHARGERS = "chargers"
+CONF_PRIORITY = "priority"
+CONF_MIN_CURRENT = "min_current"
+DEFAULT_PRIORITY = 0
+DEFAULT_MIN_CURRENT = 6
+
+CONF_SOLAR = "solar"
+CONF_SOLAR_SENSOR = "solar_sensor"
+CONF_SOLAR_VOLTAGE = "solar_voltage"
+CONF_SOLAR_PHASES = "solar_phases"
+CONF_SOLAR_HYSTERESIS = "solar_hysteresis"
+CONF_SOLAR_RAMP = "solar_ramp"
+CONF_SOLAR_INTERVAL = "solar_interval"
+CONF_SOLAR_SUSTAIN = "solar_sustain"
+DEFAULT_SOLAR_VOLTAGE = 230
+DEFAULT_SOLAR_PHASES = 1
+DEFAULT_SOLAR_HYSTERESIS = 1.0
+DEFAULT_SOLAR_RAMP = 2.0
+DEFAULT_SOLAR_INTERVAL = 10
+DEFAULT_SOLAR_SUSTAIN = 120
+
+CONF_CAPTURE = "capture"
+CONF_LISTENER_THREAD = "listener_thread"
+CONF_TRAFFIC_BUFFER = "traffic_buffer"
+DEFAULT_TRAFFIC_BUFFER = 500
+
+CONF_SENSOR = "sensor"
+CONF_DEADBAND_ABSOLUTE = "deadband_absolute"
+CONF_DEADBAND_RELATIVE = "deadband_relative"
+CONF_MIN_INTERVAL = "min_interval"
+CONF_MAX_INTERVAL = "max_interval"
+
+# Numeric sensors that accept deadband and interval options
+THROTTLE_SENSOR_TYPES = [
+    "total_kwh",
+    "voltage_phase_l1",
+    "voltage_phase_l2",
+    "voltage_phase_l3",
+    "current_phase_l1",
+    "current_phase_l2",
+    "current_phase_l3",
+    "current_available",
+    "current_delivered",
+]
+
 DOMAIN_EVENT = f"{DOMAIN}_event"
@@ -1,6 +1,7 @@
 """The Tesla Wall Charger Director integration."""
 import logging
 
+from homeassistant.core import callback
 from homeassistant.helpers.restore_state import RestoreEntity
 
 from homeassistant.components.sensor import (
@@ -61,6 +62,23 @@ class TWCDeviceEntity(RestoreEntity):
             Commands.TWC_PERIPHERAL.name: self.async_write_ha_state,
         })
 
+    @callback
+    def async_bind_device(self, twc_device: TWCPeripheral):
+        """Move the entity to a new peripheral object for the same charger."""
+        is_added = self.hass is not None and self.entity_id is not None
+
+        if is_added:
+            self._twc_device.deregister_device_data_updated_callback({
+                Commands.TWC_PERIPHERAL.name: self.async_write_ha_state,
+            })
+
+        self._twc_device = twc_device
+
+        if is_added:
+            self._twc_device.register_device_data_updated_callback({
+                Commands.TWC_PERIPHERAL.name: self.async_write_ha_state,
+            })
+
     @property
     def should_poll(self) -> bool:
         return False
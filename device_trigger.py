@@ -22,10 +22,20 @@ CONF_SUBTYPE = "subtype"
 
 CONF_CONNECTED = "connected"
 CONF_DISCONNECTED = "disconnected"
+CONF_CHARGING_STARTED = "charging_started"
+CONF_CHARGING_STOPPED = "charging_stopped"
+CONF_FAULT = "fault"
+CONF_CURRENT_LIMITED = "current_limited"
+CONF_SESSION_COMPLETE = "session_complete"
 
 TWC_EVENT = {
     CONF_CONNECTED: {CONF_EVENT: "car_connected"},
     CONF_DISCONNECTED: {CONF_EVENT: "car_disconnected"},
+    CONF_CHARGING_STARTED: {CONF_EVENT: "charging_started"},
+    CONF_CHARGING_STOPPED: {CONF_EVENT: "charging_stopped"},
+    CONF_FAULT: {CONF_EVENT: "fault"},
+    CONF_CURRENT_LIMITED: {CONF_EVENT: "current_limited"},
+    CONF_SESSION_COMPLETE: {CONF_EVENT: "session_complete"},
 }
 
 TRIGGER_SCHEMA = DEVICE_TRIGGER_BASE_SCHEMA.extend(
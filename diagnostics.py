@@ -0,0 +1,75 @@
+"""Diagnostics support for Tesla Wall Charger Director."""
+from homeassistant.components.diagnostics import REDACTED, async_redact_data
+from homeassistant.core import HomeAssistant
+from homeassistant.config_entries import ConfigEntry
+
+from .const import (
+    DOMAIN
+)
+
+DIAGNOSTICS_SESSIONS = 50
+
+# The VIN of the connected car and the charger serials identify the owner
+TO_REDACT = {
+    "vin",
+    "vin_h",
+    "vin_m",
+    "vin_l",
+    "session_vin",
+    "Session VIN",
+    "serial",
+}
+
+# The payload of these frames carries the serial or a section of the VIN
+REDACTED_COMMANDS = {"TWC_SERIAL", "TWC_VIN_HIGH", "TWC_VIN_MID", "TWC_VIN_LOW"}
+
+
+def _redact_frames(records):
+    return [dict(record, frame=REDACTED) if record["command"] in REDACTED_COMMANDS else record
+            for record in records]
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry):
+    """Return the chargers' device data and the recently recorded traffic of every bus."""
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    discovery = entry_data["discovery"]
+    health = entry_data.get("health", None)
+    session_log = entry_data.get("session_log", None)
+
+    # Devices are labelled by their order rather than their serial
+    labels = {serial: f"device_{index}" for index, serial in enumerate(discovery.get_devices())}
+    health_data = {}
+
+    if health:
+        for key, (state, attributes) in health.data.items():
+            if key == "heartbeat_age":
+                attributes = {labels.get(name, name): age for name, age in attributes.items()}
+
+            health_data[key] = {"state": state, "attributes": attributes}
+
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": async_redact_data(dict(entry.options), TO_REDACT),
+        },
+        "devices": {
+            labels[serial]: {
+                "address": f"{twc_device.get_address():04x}",
+                "live": discovery.is_live_device(twc_device),
+                "restart_count": twc_device.get_restart_counter(),
+                "device_data": async_redact_data(dict(twc_device.get_device_data()), TO_REDACT),
+            }
+            for serial, twc_device in discovery.get_devices().items()
+        },
+        "health": async_redact_data(health_data, TO_REDACT) if health else None,
+        # The latest sessions, the whole log is in the entry's sessions store
+        "sessions": async_redact_data(session_log.sessions[-DIAGNOSTICS_SESSIONS:], TO_REDACT)
+        if session_log else None,
+        "traffic": {
+            interface: {
+                "capacity": bus_data["traffic_recorder"].capacity,
+                "frames": _redact_frames(bus_data["traffic_recorder"].records()),
+            } if "traffic_recorder" in bus_data else None
+            for interface, bus_data in entry_data["buses"].items()
+        },
+    }
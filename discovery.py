@@ -0,0 +1,195 @@
+"""The Tesla Wall Charger Director integration."""
+import asyncio
+import logging
+
+from twcdirector.listener import TWCListener
+from twcdirector.device import TWCPeripheral
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.config_entries import ConfigEntry
+
+from .const import (
+    DOMAIN
+)
+
+from .event import (
+    TWCDeviceEvent
+)
+from .inventory import (
+    TWCInventory
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TWCDiscoveryCoordinator:
+    """Register each discovered charger once and hand its entities to every platform.
+
+    A single device queue and processor task runs per config entry, fed by
+    the listener of every bus the entry manages. Each
+    platform registers an entity factory, when a charger is discovered the
+    device is registered once and every platform's entities are built and
+    added in one batch. Chargers discovered before a platform is set up are
+    handed to it when it registers.
+
+    Chargers restored from the inventory are added the same way. When the
+    live peripheral for a restored charger appears its existing entities
+    are bound to it instead of being created again.
+    """
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, twc_listeners, inventory: TWCInventory):
+        self._hass = hass
+        self._entry = entry
+        self._twc_listeners = list(twc_listeners)
+        self._inventory = inventory
+        self._device_queue = asyncio.Queue()
+        self._platforms = {}
+        self._devices = {}
+        self._live_devices = set()
+        self._entities = {}
+        self._event_entities = {}
+        self._device_listeners = []
+        self._task = None
+
+    def start(self):
+        for twc_listener in self._twc_listeners:
+            twc_listener.register_device_queue(self._device_queue)
+
+        self._task = self._hass.loop.create_task(self._process_devices())
+
+    async def async_stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        for event_entity in self._event_entities.values():
+            event_entity.stop()
+
+        self._device_listeners = []
+
+    def bind_listener(self, twc_listener: TWCListener):
+        """Take the chargers discovered by a listener that replaced the previous one on its bus."""
+        twc_listener.register_device_queue(self._device_queue)
+
+    def get_devices(self):
+        return self._devices
+
+    def is_live_device(self, twc_device: TWCPeripheral):
+        """Return True if twc_device is a peripheral on the bus rather than restored from the inventory."""
+        return twc_device.get_serial() in self._live_devices and self._devices.get(twc_device.get_serial()) is twc_device
+
+    @callback
+    def async_add_device_listener(self, device_callback):
+        """Call device_callback(twc_device) for every charger added or bound, including known ones."""
+        self._device_listeners.append(device_callback)
+
+        for twc_device in self._devices.values():
+            device_callback(twc_device)
+
+        @callback
+        def remove_listener():
+            self._device_listeners.remove(device_callback)
+
+        return remove_listener
+
+    @callback
+    def _async_notify_device_listeners(self, twc_device: TWCPeripheral):
+        for device_callback in list(self._device_listeners):
+            device_callback(twc_device)
+
+    @callback
+    def async_add_platform(self, platform, entity_factory, async_add_entities):
+        """Register a platform's entity factory and add entities for known chargers."""
+        self._platforms[platform] = (entity_factory, async_add_entities)
+
+        entities = []
+        for serial, twc_device in self._devices.items():
+            device_entities = entity_factory(twc_device)
+            self._entities[serial].extend(device_entities)
+            entities.extend(device_entities)
+
+        if entities:
+            async_add_entities(entities)
+
+    @callback
+    def async_restore_devices(self):
+        """Add the chargers held in the inventory before they answer on the bus."""
+        for twc_device in self._inventory.restore_devices():
+            _LOGGER.debug(f"Restored Tesla Wall Charger Device {twc_device.get_address():04x}")
+            self._add_device(twc_device)
+
+    @callback
+    def async_add_device(self, twc_device: TWCPeripheral):
+        """Register a live charger, binding it to restored entities when they exist."""
+        serial = twc_device.get_serial()
+        self._inventory.async_track_device(twc_device)
+
+        if serial in self._live_devices and self._devices[serial] is twc_device:
+            return
+
+        self._live_devices.add(serial)
+
+        # A charger restored from the inventory or rediscovered by a restarted listener keeps its entities
+        if serial in self._devices:
+            self._bind_device(twc_device)
+        else:
+            _LOGGER.debug(f"Got new Tesla Wall Charger Device {twc_device.get_address():04x}")
+            self._add_device(twc_device)
+
+    @callback
+    def _bind_device(self, twc_device: TWCPeripheral):
+        serial = twc_device.get_serial()
+        _LOGGER.debug(f"Binding Tesla Wall Charger Device {twc_device.get_address():04x} to existing entities")
+        self._devices[serial] = twc_device
+        self._event_entities[serial].async_bind_device(twc_device)
+
+        # Refresh the firmware version held in the device registry
+        device_registry = self._hass.helpers.device_registry.async_get(self._hass)
+        device_info = self._event_entities[serial].device_info
+        device_info["config_entry_id"] = self._entry.entry_id
+        device_registry.async_get_or_create(**device_info)
+
+        entry_data = self._hass.data[DOMAIN][self._entry.entry_id]
+        for key in ("dispatchers", "pipelines", "meters"):
+            bound = entry_data.get(key, {}).get(serial, None)
+            if bound:
+                bound.async_bind_device(twc_device)
+
+        for entity in self._entities[serial]:
+            entity.async_bind_device(twc_device)
+
+        self._async_notify_device_listeners(twc_device)
+
+    @callback
+    def _add_device(self, twc_device: TWCPeripheral):
+        serial = twc_device.get_serial()
+        self._devices[serial] = twc_device
+        self._entities[serial] = []
+
+        event_entity = TWCDeviceEvent(self._hass, twc_device)
+        device_registry = self._hass.helpers.device_registry.async_get(self._hass)
+        device_info = event_entity.device_info
+        device_info["config_entry_id"] = self._entry.entry_id
+        device = device_registry.async_get_or_create(**device_info)
+        event_entity.entity_id = device.id
+        self._event_entities[serial] = event_entity
+        _LOGGER.debug(f"Trigger Device Info: {device_info}")
+
+        for platform, (entity_factory, async_add_entities) in self._platforms.items():
+            entities = entity_factory(twc_device)
+            self._entities[serial].extend(entities)
+
+            if entities:
+                async_add_entities(entities)
+                _LOGGER.debug(f"Added {len(entities)} {platform} entities for {twc_device.get_address():04x}")
+
+        self._async_notify_device_listeners(twc_device)
+
+    async def _process_devices(self):
+        while True:
+            new_device = await self._device_queue.get()
+
+            if isinstance(new_device, TWCPeripheral):
+                self.async_add_device(new_device)
+
+            self._device_queue.task_done()
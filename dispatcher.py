@@ -0,0 +1,267 @@
+"""The Tesla Wall Charger Director integration."""
+import logging
+import time
+
+from twcdirector.device import TWCPeripheral
+from twcdirector.protocol import Commands
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.config_entries import ConfigEntry
+
+from .health import async_time_callbacks
+from .const import (
+    DOMAIN,
+    CONF_DEADBAND_ABSOLUTE,
+    CONF_DEADBAND_RELATIVE,
+    CONF_MIN_INTERVAL,
+    CONF_MAX_INTERVAL
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TWCWriteThrottle:
+    """Deadband and interval limits applied to an entity's state writes.
+
+    A change is held back while it is inside the absolute or relative
+    deadband, or when the previous write is younger than the minimum
+    interval. Changes to or from zero always pass the deadband so charging
+    starting or stopping is never lost.
+
+    The maximum interval is a staleness heartbeat, the entity owning the
+    throttle writes its current value, held back or not, once the previous
+    write is older than it.
+    """
+    def __init__(self, deadband_absolute=None, deadband_relative=None, min_interval=None, max_interval=None):
+        self._deadband_absolute = deadband_absolute
+        self._deadband_relative = deadband_relative
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._last_write = None
+
+    @classmethod
+    def from_options(cls, options):
+        """Build a throttle from an options dict, None if nothing is configured."""
+        if not options or not any(options.get(key) for key in (CONF_DEADBAND_ABSOLUTE, CONF_DEADBAND_RELATIVE,
+                                                               CONF_MIN_INTERVAL, CONF_MAX_INTERVAL)):
+            return None
+
+        return cls(options.get(CONF_DEADBAND_ABSOLUTE) or None,
+                   options.get(CONF_DEADBAND_RELATIVE) or None,
+                   options.get(CONF_MIN_INTERVAL) or None,
+                   options.get(CONF_MAX_INTERVAL) or None)
+
+    def stale_in(self, now):
+        """Return the seconds until the last write is older than the maximum interval, None without one."""
+        if not self._max_interval:
+            return None
+
+        if self._last_write is None:
+            return self._max_interval
+
+        return self._last_write + self._max_interval - now
+
+    def allow(self, value, written, now):
+        """Return True if value may replace the written value now."""
+        if self._last_write is None:
+            return True
+
+        elapsed = now - self._last_write
+
+        if self._min_interval and elapsed < self._min_interval:
+            return False
+
+        if self._max_interval and elapsed >= self._max_interval:
+            return True
+
+        return not self._inside_deadband(value, written)
+
+    def _inside_deadband(self, value, written):
+        if not (self._deadband_absolute or self._deadband_relative):
+            return False
+
+        try:
+            value = float(value)
+            written = float(written)
+        except (TypeError, ValueError):
+            return False
+
+        if value == 0 or written == 0:
+            return False
+
+        delta = abs(value - written)
+
+        if self._deadband_absolute and delta < self._deadband_absolute:
+            return True
+
+        if self._deadband_relative and delta < self._deadband_relative * abs(written):
+            return True
+
+        return False
+
+    def written(self, now):
+        self._last_write = now
+
+
+class TWCDeviceDispatcher:
+    """Fan out device data updates to the entities whose value actually changed.
+
+    One dispatcher runs per charger. It is called once per status or meter
+    frame, compares the device data against the snapshot taken on the
+    previous frame and only renders and writes the entities that depend on
+    one of the keys that changed.
+
+    Entities with a dispatch_throttle may hold back a change, those are
+    re-evaluated on every frame until the change is written or reverted.
+    """
+    def __init__(self, twc_device: TWCPeripheral, callback_map_wrapper=None):
+        self._twc_device: TWCPeripheral = twc_device
+        self._entities = {}
+        self._written = {}
+        self._snapshot = {}
+        self._pending = set()
+        self._write_count = 0
+        self._skipped_count = 0
+        self._callbacks = {
+            Commands.TWC_STATUS.name: self.async_dispatch,
+            Commands.TWC_METER.name: self.async_dispatch,
+        }
+
+        if callback_map_wrapper:
+            self._callbacks = callback_map_wrapper(self._callbacks)
+
+    def start(self):
+        self._twc_device.register_device_data_updated_callback(self._callbacks)
+
+    def stop(self):
+        self._twc_device.deregister_device_data_updated_callback(self._callbacks)
+
+    @callback
+    def async_bind_device(self, twc_device: TWCPeripheral):
+        """Follow a new peripheral object for the same charger."""
+        self.stop()
+        self._twc_device = twc_device
+        self._snapshot = {}
+        self.start()
+
+    @callback
+    def async_add_entity(self, entity):
+        """Track an entity, it must provide dispatch_keys and dispatch_value()."""
+        self._entities[entity] = frozenset(entity.dispatch_keys)
+        # The entity writes its initial state when it is added to hass
+        self._written[entity] = entity.dispatch_value()
+
+        throttle = getattr(entity, "dispatch_throttle", None)
+        if throttle is not None:
+            throttle.written(time.monotonic())
+
+    @callback
+    def async_remove_entity(self, entity):
+        self._entities.pop(entity, None)
+        self._written.pop(entity, None)
+        self._pending.discard(entity)
+
+    @property
+    def entities(self):
+        return list(self._entities)
+
+    @property
+    def write_count(self):
+        return self._write_count
+
+    @property
+    def skipped_count(self):
+        return self._skipped_count
+
+    @callback
+    def async_dispatch(self):
+        """Write the state of every entity whose rendered value changed."""
+        device_data = self._twc_device.get_device_data()
+        snapshot = self._snapshot
+
+        changed_keys = {key for key, value in device_data.items() if snapshot.get(key, _MISSING) != value}
+
+        if changed_keys:
+            self._snapshot = dict(device_data)
+
+        now = time.monotonic()
+
+        for entity, keys in self._entities.items():
+            if entity not in self._pending and changed_keys.isdisjoint(keys):
+                self._skipped_count += 1
+                continue
+
+            self._async_write_entity(entity, now)
+
+    @callback
+    def async_dispatch_entity(self, entity):
+        """Write the state of an entity updated by something other than its dispatch keys, if it changed."""
+        if entity in self._entities:
+            self._async_write_entity(entity, time.monotonic())
+
+    @callback
+    def _async_write_entity(self, entity, now):
+        value = entity.dispatch_value()
+        written = self._written.get(entity, _MISSING)
+
+        if value == written:
+            self._pending.discard(entity)
+            self._skipped_count += 1
+            return
+
+        throttle = getattr(entity, "dispatch_throttle", None)
+
+        if throttle is not None:
+            if written is not _MISSING and not throttle.allow(value, written, now):
+                self._pending.add(entity)
+                self._skipped_count += 1
+                return
+
+        self._async_write(entity, value, now)
+
+    @callback
+    def async_force_write(self, entity):
+        """Write the current value of an entity whether or not it changed or its throttle holds it back."""
+        if entity in self._entities:
+            self._async_write(entity, entity.dispatch_value(), time.monotonic())
+
+    @callback
+    def async_refresh(self):
+        """Write every entity whose rendered value was changed by something other than a frame, like a setpoint."""
+        now = time.monotonic()
+
+        for entity in self._entities:
+            value = entity.dispatch_value()
+
+            if value != self._written.get(entity, _MISSING):
+                self._async_write(entity, value, now)
+
+    @callback
+    def _async_write(self, entity, value, now):
+        throttle = getattr(entity, "dispatch_throttle", None)
+
+        if throttle is not None:
+            throttle.written(now)
+
+        self._pending.discard(entity)
+        self._written[entity] = value
+        self._write_count += 1
+        entity.async_write_ha_state()
+
+
+@callback
+def async_get_device_dispatcher(hass: HomeAssistant, entry: ConfigEntry, twc_device: TWCPeripheral):
+    """Return the dispatcher for a charger, creating it on first use."""
+    dispatchers = hass.data[DOMAIN][entry.entry_id].setdefault("dispatchers", {})
+    dispatcher = dispatchers.get(twc_device.get_serial(), None)
+
+    if dispatcher is None:
+        dispatcher = TWCDeviceDispatcher(twc_device,
+                                         lambda callback_map: async_time_callbacks(hass, entry, callback_map))
+        dispatcher.start()
+        dispatchers[twc_device.get_serial()] = dispatcher
+        _LOGGER.debug(f"Created dispatcher for {twc_device.get_address():04X}")
+
+    return dispatcher
@@ -0,0 +1,291 @@
+"""The Tesla Wall Charger Director integration."""
+import logging
+import time
+
+from twcdirector.device import TWCPeripheral
+from twcdirector.protocol import Commands
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.config_entries import ConfigEntry
+
+from .const import (
+    DOMAIN
+)
+from .health import async_time_callbacks
+
+_LOGGER = logging.getLogger(__name__)
+
+PHASES = ("l1", "l2", "l3")
+VIN_KEYS = ("vin_h", "vin_m", "vin_l")
+PHASE_KEYS = tuple((f"voltage_phase_{phase}", f"current_phase_{phase}") for phase in PHASES)
+# Meter frames further apart than this are not integrated, the charger or the bus was away
+MAX_INTEGRATION_GAP = 60
+WATT_SECONDS_PER_KWH = 3600000
+SECONDS_PER_HOUR = 3600
+# Distinct lower total energy readings, none of them zero, accepted as a replaced meter
+REBASE_SAMPLES = 3
+
+
+class TWCPowerMeter:
+    """Per charger power and session energy derived from the meter frames.
+
+    Every meter frame the power of each phase is calculated from its
+    voltage and current and the session energy is integrated from the
+    total power by the trapezoid rule. The session energy is reset when a
+    car connects, unless it is the car of a session restored after a
+    restart that has not been seen to disconnect. The current delivered in
+    the status frames is integrated the same way for the session's peak
+    and mean charging current, and the session is appended to the entry's
+    session log when its car disconnects. A restored session is appended
+    once the charger reports no car or another car.
+
+    The charger's total energy is only reported once a reading arrives or
+    the last good value is restored, and never goes backwards. A lower
+    reading is rejected and counted, unless REBASE_SAMPLES distinct lower
+    readings in a row show the meter really restarted from a lower value.
+    Readings are only checked by the meter frame callback, reading the
+    total energy does not change the guard.
+    """
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, twc_device: TWCPeripheral):
+        self._twc_device: TWCPeripheral = twc_device
+        self._phase_power = (None, None, None)
+        self._total_power = None
+        self._session_energy = 0.0
+        self._session_started = None
+        self._session_vin = None
+        self._restored_session = False
+        # The session's car was seen connected since the start, its disconnect completes the session
+        self._session_active = False
+        self._session_peak_current = 0.0
+        self._session_charge = 0.0
+        self._session_charging_time = 0.0
+        self._last_current_sample = None
+        self._total_energy = None
+        self._last_total_reading = None
+        self._rebase_readings = 0
+        self._rejected_count = 0
+        self._last_sample = None
+        self._listeners = []
+        self._session_log = hass.data[DOMAIN][entry.entry_id].get("session_log", None)
+        self._callbacks = async_time_callbacks(hass, entry, {
+            Commands.TWC_METER.name: self._async_meter_updated,
+            Commands.TWC_STATUS.name: self._async_status_updated,
+            "TWC_CAR_CONNECTED": self._async_car_connected,
+        })
+
+    def start(self):
+        self._twc_device.register_device_data_updated_callback(self._callbacks)
+
+    def stop(self):
+        self._twc_device.deregister_device_data_updated_callback(self._callbacks)
+
+    @callback
+    def async_bind_device(self, twc_device: TWCPeripheral):
+        """Follow a new peripheral object for the same charger."""
+        self.stop()
+        self._twc_device = twc_device
+        # Do not integrate across the gap to the new peripheral's first frame
+        self._last_sample = None
+        self._last_current_sample = None
+        self.start()
+
+    @callback
+    def async_add_listener(self, update_callback):
+        """Call update_callback when the power or session energy is updated."""
+        self._listeners.append(update_callback)
+
+        @callback
+        def remove_listener():
+            self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    def phase_power(self, phase):
+        return self._phase_power[phase]
+
+    @property
+    def total_power(self):
+        return self._total_power
+
+    @property
+    def session_energy(self):
+        return self._session_energy
+
+    @property
+    def session_started(self):
+        return self._session_started
+
+    @property
+    def session_vin(self):
+        return self._session_vin
+
+    @property
+    def session_peak_current(self):
+        return self._session_peak_current
+
+    @property
+    def session_charge(self):
+        """Return the charge delivered in the session in ampere hours."""
+        return self._session_charge
+
+    @property
+    def session_charging_time(self):
+        return self._session_charging_time
+
+    @property
+    def rejected_count(self):
+        return self._rejected_count
+
+    @callback
+    def async_restore_total_energy(self, total_energy):
+        """Start from the last good total energy reported before a restart."""
+        if self._total_energy is None or total_energy > self._total_energy:
+            self._total_energy = total_energy
+
+    @property
+    def total_energy(self):
+        """Return the guarded total energy in kWh, None until a reading arrived or a value was restored."""
+        return self._total_energy
+
+    @callback
+    def _async_update_total(self):
+        """Check a new total energy reading against the last good total energy."""
+        reading = self._twc_device.get_device_data().get("total_kwh", None)
+
+        if reading is None or reading == self._last_total_reading:
+            return
+
+        self._last_total_reading = reading
+
+        if self._total_energy is None or reading >= self._total_energy:
+            self._total_energy = reading
+            self._rebase_readings = 0
+        elif reading and self._rebase_readings + 1 >= REBASE_SAMPLES:
+            _LOGGER.warning(f"Total energy of {self._twc_device.get_serial()} restarted from {reading} kWh, "
+                            f"was {self._total_energy} kWh")
+            self._total_energy = reading
+            self._rebase_readings = 0
+        else:
+            _LOGGER.debug(f"Rejected total energy {reading} kWh of {self._twc_device.get_serial()}, "
+                          f"last good {self._total_energy} kWh")
+            self._rebase_readings = self._rebase_readings + 1 if reading else 0
+            self._rejected_count += 1
+
+    @callback
+    def async_restore_session(self, session_energy, session_started, session_vin,
+                              peak_current=0.0, charge=0.0, charging_time=0.0):
+        """Continue the session that was running before a restart."""
+        if self._last_sample is None and not self._session_energy:
+            self._session_energy = session_energy
+            self._session_started = session_started
+            self._session_vin = session_vin
+            self._session_peak_current = peak_current
+            self._session_charge = charge
+            self._session_charging_time = charging_time
+            self._restored_session = True
+
+    @callback
+    def _async_notify_listeners(self):
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    @callback
+    def _async_car_connected(self):
+        if not self._twc_device.is_car_connected():
+            self._restored_session = False
+
+            if self._session_active:
+                self._session_active = False
+                self._async_complete_session()
+            return
+
+        vin = self._twc_device.get_vin()
+        self._session_active = True
+
+        # The listener reports the car of a restored session as newly connected
+        if self._restored_session and vin == self._session_vin:
+            self._restored_session = False
+            return
+
+        # Another car took the charger over while Home Assistant was down
+        if self._restored_session:
+            self._restored_session = False
+            self._async_complete_session()
+
+        self._session_energy = 0.0
+        self._session_started = time.time()
+        self._session_vin = vin
+        self._session_peak_current = 0.0
+        self._session_charge = 0.0
+        self._session_charging_time = 0.0
+        self._async_notify_listeners()
+
+    @callback
+    def _async_complete_session(self):
+        if self._session_log is None or self._session_started is None:
+            return
+
+        self._session_log.async_append(
+            self._twc_device.get_serial(), self._session_vin, self._session_started, time.time(),
+            self._session_charging_time, self._session_energy, self._session_peak_current, self._session_charge)
+
+    @callback
+    def _async_status_updated(self):
+        # The library only reports a car connecting or disconnecting when asked whether one is connected
+        car_connected = self._twc_device.is_car_connected()
+
+        # Once every VIN section was polled, a restored session without a car ended while Home Assistant was down
+        if self._restored_session and not car_connected and all(
+                key in self._twc_device.get_device_data() for key in VIN_KEYS):
+            self._restored_session = False
+            self._async_complete_session()
+
+        current = self._twc_device.get_status_current_delivered() / 100
+        now = time.monotonic()
+
+        if self._last_current_sample is not None:
+            last_time, last_current = self._last_current_sample
+            interval = now - last_time
+
+            if interval <= MAX_INTEGRATION_GAP and (last_current or current):
+                self._session_charge += (last_current + current) / 2 * interval / SECONDS_PER_HOUR
+                self._session_charging_time += interval
+
+        if current > self._session_peak_current:
+            self._session_peak_current = current
+
+        self._last_current_sample = (now, current)
+
+    @callback
+    def _async_meter_updated(self):
+        device_data = self._twc_device.get_device_data()
+        now = time.monotonic()
+        self._async_update_total()
+
+        self._phase_power = tuple(device_data.get(voltage_key, 0) * device_data.get(current_key, 0)
+                                  for (voltage_key, current_key) in PHASE_KEYS)
+        total_power = sum(self._phase_power)
+
+        if self._last_sample is not None:
+            last_time, last_power = self._last_sample
+
+            if now - last_time <= MAX_INTEGRATION_GAP:
+                self._session_energy += (last_power + total_power) / 2 * (now - last_time) / WATT_SECONDS_PER_KWH
+
+        self._total_power = total_power
+        self._last_sample = (now, total_power)
+        self._async_notify_listeners()
+
+
+@callback
+def async_get_power_meter(hass: HomeAssistant, entry: ConfigEntry, twc_device: TWCPeripheral):
+    """Return the power meter for a charger, creating it on first use."""
+    meters = hass.data[DOMAIN][entry.entry_id].setdefault("meters", {})
+    meter = meters.get(twc_device.get_serial(), None)
+
+    if meter is None:
+        meter = TWCPowerMeter(hass, entry, twc_device)
+        meter.start()
+        meters[twc_device.get_serial()] = meter
+
+    return meter
@@ -1,10 +1,11 @@
 """The Tesla Wall Charger Director integration."""
 import logging
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.const import CONF_EVENT, CONF_ID, CONF_DEVICE_ID
 
 from twcdirector.device import TWCPeripheral
+from twcdirector.protocol import Commands, Status
 
 from .const import (
     DOMAIN_EVENT
@@ -16,22 +17,100 @@ from .device import (
 
 _LOGGER = logging.getLogger(__name__)
 
+CHARGING_STATES = frozenset((
+    Status.CHARGING,
+    Status.CHARGE_STARTED,
+    Status.CHARGING_CAR_LOW,
+    Status.ADJUSTING,
+    Status.SETTING_LIMIT,
+    Status.ADJUSTMENT_COMPLETE,
+))
+# 100ths of an amp, the car is limited when it draws this close to the available current
+LIMITED_TOLERANCE = 100
+# A limited car is released once it draws this far below the available current
+LIMITED_RELEASE = 200
+
 
 class TWCDeviceEvent(TWCDeviceEntity):
+    """Fire the car connection and charging transitions of a charger as events.
+
+    Every status frame updates a small state machine of the charger, only
+    its edges are fired: charging_started and charging_stopped when the
+    charge state enters or leaves a charging state, fault when it enters
+    the error state and current_limited when a charging car starts drawing
+    all of the available current below the charger's maximum. A car that
+    disconnects after charging fires session_complete. The first status
+    after a start only sets the state, it is not an edge.
+    """
     def __init__(self, hass: HomeAssistant, twc_device: TWCPeripheral):
         super().__init__(twc_device)
         self.hass = hass
         self._name = self._device_name
+        self._charging = None
+        self._fault = None
+        self._limited = False
+        self._session_charged = False
+        self._callbacks = {
+            "TWC_CAR_CONNECTED": self._connected_event,
+            Commands.TWC_STATUS.name: self._async_status_updated,
+        }
 
-        self._twc_device.register_device_data_updated_callback({
-            "TWC_CAR_CONNECTED": self._connected_event
-        })
+        self._twc_device.register_device_data_updated_callback(self._callbacks)
 
-    async def _connected_event(self):
-        event_data = {
+    @callback
+    def async_bind_device(self, twc_device: TWCPeripheral):
+        """Move the event source to a new peripheral object for the same charger."""
+        self._twc_device.deregister_device_data_updated_callback(self._callbacks)
+        self._twc_device = twc_device
+        self._twc_device.register_device_data_updated_callback(self._callbacks)
+
+    def stop(self):
+        self._twc_device.deregister_device_data_updated_callback(self._callbacks)
+
+    @callback
+    def _async_fire(self, event, **data):
+        self.hass.bus.async_fire(DOMAIN_EVENT, {
             CONF_ID: self.unique_id,
             CONF_DEVICE_ID: self.entity_id,
-            CONF_EVENT: "car_connected" if self._twc_device.is_car_connected() else "car_disconnected"
-        }
+            CONF_EVENT: event,
+            **data
+        })
+
+    async def _connected_event(self):
+        connected = self._twc_device.is_car_connected()
+        self._async_fire("car_connected" if connected else "car_disconnected")
+
+        if not connected and self._session_charged:
+            self._session_charged = False
+            self._async_fire("session_complete")
+
+    @callback
+    def _async_status_updated(self):
+        charge_state = self._twc_device.get_status_charge_state()
+        available = self._twc_device.get_status_current_available()
+        delivered = self._twc_device.get_status_current_delivered()
+        charging = charge_state in CHARGING_STATES
+        fault = charge_state == Status.ERROR
+        status = {"charge_state": charge_state.name, "current_available": available / 100,
+                  "current_delivered": delivered / 100}
+
+        if self._charging is not None and charging != self._charging:
+            self._async_fire("charging_started" if charging else "charging_stopped", **status)
+
+        if self._fault is not None and fault and not self._fault:
+            self._async_fire("fault", **status)
+
+        if charging:
+            self._session_charged = True
+
+            if not self._limited and available < self._twc_device.get_max_current() and \
+                    delivered >= available - LIMITED_TOLERANCE:
+                self._limited = True
+                self._async_fire("current_limited", **status)
+            elif self._limited and delivered < available - LIMITED_RELEASE:
+                self._limited = False
+        else:
+            self._limited = False
 
-        self.hass.bus.async_fire(DOMAIN_EVENT, event_data)
+        self._charging = charging
+        self._fault = fault
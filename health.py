@@ -0,0 +1,258 @@
+"""The Tesla Wall Charger Director integration."""
+import inspect
+import logging
+import time
+from bisect import bisect_left
+from datetime import timedelta
+
+from twcdirector.protocol import Commands
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.helpers.event import async_track_time_interval
+
+from .const import (
+    DOMAIN
+)
+from .listener import (
+    TWCDirectorListener,
+    DIRECTION_RECEIVE
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+PUBLISH_INTERVAL = timedelta(seconds=30)
+# Upper bounds in seconds of the callback time histogram buckets, the last bucket is unbounded
+CALLBACK_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05)
+UNKNOWN_COMMAND = "UNKNOWN"
+
+_COMMAND_NAMES = {command.value: command.name for command in Commands}
+
+
+class TWCCallbackHistogram:
+    """Fixed bucket histogram of callback run times."""
+    def __init__(self, buckets=CALLBACK_BUCKETS):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._total = 0.0
+
+    def record(self, seconds):
+        self._counts[bisect_left(self._buckets, seconds)] += 1
+        self._total += seconds
+
+    @property
+    def count(self):
+        return sum(self._counts)
+
+    @property
+    def total(self):
+        return self._total
+
+    def as_dict(self):
+        """Return the bucket counts keyed by their upper bound in milliseconds."""
+        labels = [f"<= {bucket * 1000:g} ms" for bucket in self._buckets]
+        labels.append(f"> {self._buckets[-1] * 1000:g} ms")
+        return dict(zip(labels, self._counts))
+
+
+class TWCHealthMonitor:
+    """Collect bus and integration health for a config entry.
+
+    Received frames are counted per command and the last frame from each
+    peripheral is timed by a frame observer on the listener of every bus,
+    the queue and error counters are summed over the buses with each bus's
+    own in the attributes. Callbacks registered through
+    wrap_callbacks() are timed into a fixed histogram. Nothing is published
+    per frame, the listeners are called every PUBLISH_INTERVAL with the
+    rates over the interval and the current counters.
+    """
+    def __init__(self, hass: HomeAssistant, twc_listeners):
+        self._hass = hass
+        self._twc_listeners = {twc_listener.interface: twc_listener for twc_listener in twc_listeners}
+        self._frame_counts = {}
+        self._published_frame_counts = {}
+        self._last_seen = {}
+        self._callback_time = TWCCallbackHistogram()
+        # Errors counted by listeners replaced after a recovery
+        self._checksum_errors = {}
+        self._parse_errors = {}
+        self._recovery_count = 0
+        self._last_recovery = None
+        self._published = None
+        self._remove_observers = {}
+        self._unsub_publish = None
+        self._listeners = []
+        self.data = {}
+
+    def start(self):
+        self._published = time.monotonic()
+
+        for interface, twc_listener in self._twc_listeners.items():
+            self._remove_observers[interface] = twc_listener.add_frame_observer(self._frame_observer)
+
+        self._unsub_publish = async_track_time_interval(self._hass, self._async_publish, PUBLISH_INTERVAL)
+
+    def stop(self):
+        for remove_observer in self._remove_observers.values():
+            remove_observer()
+
+        self._remove_observers = {}
+
+        if self._unsub_publish:
+            self._unsub_publish()
+            self._unsub_publish = None
+
+    def bind_listener(self, twc_listener: TWCDirectorListener):
+        """Follow the listener that replaced the previous one on its bus."""
+        interface = twc_listener.interface
+        previous = self._twc_listeners[interface]
+        self._checksum_errors[interface] = self._checksum_errors.get(interface, 0) + previous.checksum_errors
+        self._parse_errors[interface] = self._parse_errors.get(interface, 0) + previous.parse_errors
+        self._twc_listeners[interface] = twc_listener
+
+        if interface in self._remove_observers:
+            self._remove_observers[interface]()
+            self._remove_observers[interface] = twc_listener.add_frame_observer(self._frame_observer)
+
+    def record_recovery(self, recovery_time, reason):
+        self._recovery_count += 1
+        self._last_recovery = (recovery_time, reason)
+
+    @callback
+    def async_add_listener(self, update_callback):
+        """Call update_callback every time the health data is published."""
+        self._listeners.append(update_callback)
+
+        @callback
+        def remove_listener():
+            self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    def _frame_observer(self, direction, timestamp, frame):
+        if direction != DIRECTION_RECEIVE or len(frame) < 5:
+            return
+
+        command = frame[2]
+        self._frame_counts[command] = self._frame_counts.get(command, 0) + 1
+        self._last_seen[(frame[3] << 8) | frame[4]] = timestamp
+
+    def wrap_callbacks(self, callback_map):
+        """Return callback_map with every callback timed into the callback histogram."""
+        return {name: self._timed_callback(update_callback) for name, update_callback in callback_map.items()}
+
+    def _timed_callback(self, update_callback):
+        record = self._callback_time.record
+
+        # The peripheral awaits coroutine functions and calls anything else
+        if inspect.iscoroutinefunction(update_callback):
+            async def timed_coroutine():
+                started = time.perf_counter()
+                try:
+                    await update_callback()
+                finally:
+                    record(time.perf_counter() - started)
+
+            return timed_coroutine
+
+        def timed_callback():
+            started = time.perf_counter()
+            try:
+                update_callback()
+            finally:
+                record(time.perf_counter() - started)
+
+        return timed_callback
+
+    def _device_name(self, address):
+        for twc_listener in self._twc_listeners.values():
+            twc_device = twc_listener.get_device_list().get(address, None)
+
+            if twc_device is not None:
+                return twc_device.get_serial()
+
+        return f"{address:04x}"
+
+    @callback
+    def _async_publish(self, now=None):
+        published = time.monotonic()
+        interval = max(published - self._published, 1e-3)
+        self._published = published
+
+        frame_rates = {}
+        for command, count in self._frame_counts.items():
+            name = _COMMAND_NAMES.get(command, UNKNOWN_COMMAND)
+            rate = (count - self._published_frame_counts.get(command, 0)) / interval
+            frame_rates[name] = round(frame_rates.get(name, 0) + rate, 2)
+
+        self._published_frame_counts = dict(self._frame_counts)
+
+        heartbeat_ages = {self._device_name(address): round(published - last_seen, 1)
+                          for address, last_seen in self._last_seen.items()}
+
+        bus_errors = {}
+        queue_sizes = {}
+        oldest_ages = []
+
+        for interface, twc_listener in self._twc_listeners.items():
+            bus_errors[interface] = (self._checksum_errors.get(interface, 0) + twc_listener.checksum_errors,
+                                     self._parse_errors.get(interface, 0) + twc_listener.parse_errors)
+            queue_sizes[interface] = twc_listener.transmit_queue.qsize()
+            oldest_age = twc_listener.transmit_queue.oldest_age()
+
+            if oldest_age is not None:
+                oldest_ages.append(oldest_age)
+
+        callback_time = self._callback_time
+        checksum_errors = sum(errors[0] for errors in bus_errors.values())
+        parse_errors = sum(errors[1] for errors in bus_errors.values())
+
+        # Every listener of an entry hands off through the same thread, or none does
+        handoff = next(iter(self._twc_listeners.values())).handoff
+
+        self.data = {
+            "frame_rate": (round(sum(frame_rates.values()), 2), frame_rates),
+            "bus_errors": (checksum_errors + parse_errors, dict({
+                "Checksum Errors": checksum_errors,
+                "Parse Errors": parse_errors,
+                "Unknown Command Frames": sum(count for command, count in self._frame_counts.items()
+                                              if command not in _COMMAND_NAMES),
+            }, **{interface: sum(errors) for interface, errors in bus_errors.items()})),
+            "transmit_queue": (sum(queue_sizes.values()), dict({
+                "Oldest Message Age": round(max(oldest_ages), 2) if oldest_ages else None,
+            }, **queue_sizes)),
+            "heartbeat_age": (max(heartbeat_ages.values()) if heartbeat_ages else None, heartbeat_ages),
+            "callback_time": (round(callback_time.total * 1000 / callback_time.count, 3) if callback_time.count else None,
+                              dict(callback_time.as_dict(), Calls=callback_time.count)),
+            "recoveries": (self._recovery_count, {
+                "Last Recovery Time": round(self._last_recovery[0], 1) if self._last_recovery else None,
+                "Last Failure": self._last_recovery[1] if self._last_recovery else None,
+            }),
+        }
+
+        if handoff is not None:
+            latency = handoff.latency
+            self.data["handoff_latency"] = (_milliseconds(latency.percentile(50)), {
+                "p95": _milliseconds(latency.percentile(95)),
+                "Last": _milliseconds(latency.last),
+                "Batches": handoff.batch_count,
+                "Calls per Batch": round(handoff.call_count / handoff.batch_count, 2) if handoff.batch_count else None,
+            })
+
+        for update_callback in list(self._listeners):
+            update_callback()
+
+
+def _milliseconds(seconds):
+    return round(seconds * 1000, 3) if seconds is not None else None
+
+
+@callback
+def async_time_callbacks(hass: HomeAssistant, entry: ConfigEntry, callback_map):
+    """Return callback_map timed by the entry's health monitor, unchanged if there is none."""
+    health = hass.data[DOMAIN].get(entry.entry_id, {}).get("health", None)
+
+    if health is None:
+        return callback_map
+
+    return health.wrap_callbacks(callback_map)
@@ -0,0 +1,93 @@
+"""The Tesla Wall Charger Director integration."""
+import logging
+from datetime import timedelta
+
+from twcdirector.device import TWCPeripheral
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    DOMAIN
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+SAVE_DELAY = 10
+SNAPSHOT_INTERVAL = timedelta(minutes=5)
+
+
+class TWCInventory:
+    """Persisted inventory of the chargers seen on a config entry's bus.
+
+    The inventory holds the serial, address, firmware version, maximum
+    current and last known device data of every charger. It is used to
+    create the devices and entities before the chargers answer on the bus.
+    """
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
+        self._hass = hass
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.inventory")
+        self._chargers = {}
+        self._devices = {}
+        self._unsub_snapshot = None
+
+    async def async_load(self):
+        data = await self._store.async_load()
+
+        if data:
+            self._chargers = data.get("chargers", {})
+
+        _LOGGER.debug(f"Loaded {len(self._chargers)} chargers from the inventory")
+
+    def start(self):
+        self._unsub_snapshot = async_track_time_interval(self._hass, self._async_snapshot, SNAPSHOT_INTERVAL)
+
+    async def async_stop(self):
+        if self._unsub_snapshot:
+            self._unsub_snapshot()
+            self._unsub_snapshot = None
+
+        # Save now rather than leave a delayed save behind the unloaded entry
+        if self._devices:
+            await self._store.async_save(self._data_to_save())
+
+    def restore_devices(self):
+        """Return stand-in peripherals holding the last known data of each charger."""
+        devices = []
+
+        for serial, charger in self._chargers.items():
+            twc_device = TWCPeripheral(address=charger["address"], max_current=charger["max_current"])
+            twc_device.get_device_data().update(charger["device_data"])
+            twc_device.get_device_data()["serial"] = serial
+            twc_device.get_device_data()["version"] = charger["version"]
+            devices.append(twc_device)
+
+        return devices
+
+    @callback
+    def async_track_device(self, twc_device: TWCPeripheral):
+        """Record a live charger and save the inventory."""
+        self._devices[twc_device.get_serial()] = twc_device
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _async_snapshot(self, now=None):
+        if self._devices:
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self):
+        for serial, twc_device in self._devices.items():
+            self._chargers[serial] = {
+                "address": twc_device.get_address(),
+                "version": twc_device.get_version(),
+                "max_current": twc_device.get_max_current(),
+                # car_connected is derived on read, restoring it would fire a spurious disconnect event
+                "device_data": {key: value for key, value in twc_device.get_device_data().items()
+                                if key != "car_connected" and isinstance(value, (int, float, str))},
+            }
+
+        return {"chargers": self._chargers}
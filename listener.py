@@ -0,0 +1,194 @@
+"""The Tesla Wall Charger Director integration."""
+import asyncio
+import logging
+import time
+from collections import deque
+
+from twcdirector.listener import TWCListener
+from twcdirector.protocol import TWCProtocol, ChecksumMismatchError
+
+from homeassistant.core import callback
+
+_LOGGER = logging.getLogger(__name__)
+
+DIRECTION_RECEIVE = 0
+DIRECTION_TRANSMIT = 1
+
+
+class TWCDirectorProtocol(TWCProtocol):
+    """TWCProtocol that counts the frames it fails to decode."""
+    def __init__(self):
+        super().__init__()
+        self.checksum_errors = 0
+        self.parse_errors = 0
+
+    def extract_command_data(self, message):
+        try:
+            return super().extract_command_data(message)
+        except ChecksumMismatchError:
+            self.checksum_errors += 1
+            raise
+        except (KeyError, IndexError, ValueError):
+            self.parse_errors += 1
+            raise
+
+
+class TWCTransmitQueue(asyncio.Queue):
+    """Transmit queue that keeps the time each queued message was put."""
+    def _init(self, maxsize):
+        super()._init(maxsize)
+        self._put_times = deque()
+
+    def _put(self, item):
+        self._put_times.append(time.monotonic())
+        super()._put(item)
+
+    def _get(self):
+        self._put_times.popleft()
+        return super()._get()
+
+    def oldest_age(self):
+        """Return the seconds the oldest queued message has waited, None if the queue is empty."""
+        if not self._put_times:
+            return None
+
+        return time.monotonic() - self._put_times[0]
+
+
+class TWCDirectorListener(TWCListener):
+    """TWCListener that reports every raw frame to the registered frame observers.
+
+    Observers are called with the direction, a time.monotonic() timestamp
+    and the raw frame as it appeared on the bus.
+
+    Frames that fail to decode are counted by the protocol and the time
+    messages wait in the transmit queue is tracked.
+
+    A listener running on its own thread is given a handoff, then the frame
+    observers, new device queues and the peripheral callbacks registered by
+    the integration are called on the Home Assistant loop through it, and
+    controller commands are sent from Home Assistant with async_run(). The
+    controller's own peripheral callbacks keep running on the listener's
+    loop.
+    """
+    def __init__(self, handoff=None, **kwargs):
+        super().__init__(**kwargs)
+        self._handoff = handoff
+        self._frame_observers = []
+        self._protocol = TWCDirectorProtocol()
+        # Devices are handed the transmit queue as they are discovered, nothing holds the original yet
+        self._transmit_queue = TWCTransmitQueue()
+
+    @property
+    def interface(self):
+        return self._rs485_interface
+
+    @property
+    def checksum_errors(self):
+        return self._protocol.checksum_errors
+
+    @property
+    def parse_errors(self):
+        return self._protocol.parse_errors
+
+    @property
+    def transmit_queue(self) -> TWCTransmitQueue:
+        return self._transmit_queue
+
+    @property
+    def handoff(self):
+        return self._handoff
+
+    async def async_run(self, coro):
+        """Run a controller coroutine on the listener's loop and wait for it."""
+        if self._handoff is None:
+            return await coro
+
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._event_loop))
+
+    async def shutdown(self):
+        if self._handoff is not None:
+            # The device queues belong to the Home Assistant loop, nothing waits on them for the shutdown
+            self._new_device_queues = []
+
+        return await super().shutdown()
+
+    def device_initialised_callback(self, new_device):
+        if self._handoff is None:
+            super().device_initialised_callback(new_device)
+            return
+
+        self._hand_off_callbacks(new_device)
+        self._handoff.call(super().device_initialised_callback, new_device)
+
+    def _hand_off_callbacks(self, twc_device):
+        """Wrap the callbacks registered on twc_device from now on to run on the Home Assistant loop.
+
+        The controller registered its callbacks when the peripheral was
+        created, only the integration registers them once it is initialised.
+        """
+        register = twc_device.register_device_data_updated_callback
+        deregister = twc_device.deregister_device_data_updated_callback
+        # The same callback is deregistered with the wrapper it was registered with
+        wrappers = {}
+
+        def wrap_callbacks(callback_map):
+            return {key: wrappers.setdefault(update_callback, self._handoff.wrap_callback(update_callback))
+                    if callable(update_callback) else update_callback
+                    for key, update_callback in callback_map.items()}
+
+        def register_callbacks(callback_map: dict):
+            register(wrap_callbacks(callback_map))
+
+        def deregister_callbacks(callback_map: dict):
+            deregister(wrap_callbacks(callback_map))
+
+        twc_device.register_device_data_updated_callback = register_callbacks
+        twc_device.deregister_device_data_updated_callback = deregister_callbacks
+
+    @callback
+    def add_frame_observer(self, frame_observer):
+        self._frame_observers.append(frame_observer)
+
+        @callback
+        def remove_observer():
+            self._frame_observers.remove(frame_observer)
+
+        return remove_observer
+
+    def _notify_frame_observers(self, direction, frame):
+        if not self._frame_observers:
+            return
+
+        timestamp = time.monotonic()
+
+        if self._handoff is not None:
+            self._handoff.call(self._call_frame_observers, direction, timestamp, bytes(frame))
+        else:
+            self._call_frame_observers(direction, timestamp, frame)
+
+    def _call_frame_observers(self, direction, timestamp, frame):
+        for frame_observer in self._frame_observers:
+            try:
+                frame_observer(direction, timestamp, frame)
+            except Exception:
+                _LOGGER.exception("Frame observer raised an exception")
+
+    async def process_message(self, message):
+        self._notify_frame_observers(DIRECTION_RECEIVE, message)
+        await super().process_message(message)
+
+    async def process_transmit_messages(self):
+        self._is_processing_transmit_messages = True
+
+        while self._is_processing_transmit_messages is True:
+            transmit_message = await self._transmit_queue.get()
+
+            if transmit_message:
+                self._notify_frame_observers(DIRECTION_TRANSMIT, transmit_message["message"])
+                await self._rs485_bus.write_async(transmit_message["message"])
+
+            self._transmit_queue.task_done()
+
+        self._has_stopped_transmission.set()
+        return True
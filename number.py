@@ -1,17 +1,17 @@
 """The Tesla Wall Charger Director integration."""
-import asyncio
 import logging
 
 from homeassistant.components.number import NumberEntity
+from homeassistant.const import STATE_UNAVAILABLE, STATE_UNKNOWN
 
-from twcdirector.listener import TWCListener
-from twcdirector.device import TWCPeripheral, TWCController
-from twcdirector.protocol import Commands
+from twcdirector.device import TWCPeripheral
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.config_entries import ConfigEntry
 
 from .device import TWCDeviceEntity
+from .dispatcher import async_get_device_dispatcher
+from .command import async_get_command_pipeline
 from .const import (
     DOMAIN
 )
@@ -20,36 +20,10 @@ from .const import (
 _LOGGER = logging.getLogger(__name__)
 
 
-async def new_number_processor(device_queue, hass, entry, async_add_entities):
-    twc_listener: TWCListener = hass.data[DOMAIN][entry.entry_id]["twc_listener"]
-
-    while True:
-        new_device: TWCPeripheral = await device_queue.get()
-
-        if isinstance(new_device, TWCPeripheral):
-            _LOGGER.debug(f"Got new Tesla Wall Charger Device {new_device.get_address():04x}")
-            endpoints = []
-
-            default_current_endpoint = TWCDefaultCurrentEntity(new_device, twc_listener.get_fake_controller(), entry)
-            endpoints.append(default_current_endpoint)
-            device_registry = hass.helpers.device_registry.async_get(hass)
-            device_info = default_current_endpoint.device_info
-            device_info["config_entry_id"] = entry.entry_id
-            device = device_registry.async_get_or_create(**device_info)
-            _LOGGER.debug(f"Set Default Current Endpoint: {default_current_endpoint.entity_id} added")
-
-            session_current_endpoint = TWCSessionCurrentEntity(new_device, twc_listener.get_fake_controller(), entry)
-            endpoints.append(session_current_endpoint)
-            device_registry = hass.helpers.device_registry.async_get(hass)
-            device_info = session_current_endpoint.device_info
-            device_info["config_entry_id"] = entry.entry_id
-            device = device_registry.async_get_or_create(**device_info)
-            _LOGGER.debug(f"Set Session Current Endpoint: {session_current_endpoint.entity_id} added")
-
-            if endpoints:
-                async_add_entities(endpoints)
-
-        device_queue.task_done()
+def build_number_entities(twc_device: TWCPeripheral, entry: ConfigEntry):
+    """Build the number entities of a charger."""
+    return [TWCDefaultCurrentEntity(twc_device, entry),
+            TWCSessionCurrentEntity(twc_device, entry)]
 
 
 async def async_setup_platform(hass: HomeAssistant, entry: ConfigEntry, async_add_entities, discovery_info=None):
@@ -64,12 +38,9 @@ async def async_setup_platform(hass: HomeAssistant, entry: ConfigEntry, async_ad
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities):
     """Set up TWCDevice from a config entry."""
 
-    device_queue = asyncio.Queue()
-    twc_listener = hass.data[DOMAIN][entry.entry_id]["twc_listener"]
-
-    twc_listener.register_device_queue(device_queue)
-
-    hass.loop.create_task(new_number_processor(device_queue, hass, entry, async_add_entities))
+    discovery = hass.data[DOMAIN][entry.entry_id]["discovery"]
+    discovery.async_add_platform("number", lambda twc_device: build_number_entities(twc_device, entry),
+                                 async_add_entities)
 
     return True
 
@@ -81,7 +52,7 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
 
 class TWCDefaultCurrentEntity(NumberEntity, TWCDeviceEntity):
     """Implementation of a Tesla Wall Charger Director Session Current Entity."""
-    def __init__(self, twc_device: TWCPeripheral, twc_controller: TWCController, entry):
+    def __init__(self, twc_device: TWCPeripheral, entry):
         """Initialize the sensor."""
         TWCDeviceEntity.__init__(self, twc_device)
         self._name = f"{self._twc_device.get_serial()} Default Current Setting"
@@ -89,6 +60,9 @@ class TWCDefaultCurrentEntity(NumberEntity, TWCDeviceEntity):
         self._config_entry = entry
         self._min_value = 0
         self._step = 1
+        self._dispatcher = None
+        # The setpoint is held locally, it is written when it is set
+        self.dispatch_keys = ()
 
     async def async_added_to_hass(self):
         """When entity is added to hass."""
@@ -96,20 +70,27 @@ class TWCDefaultCurrentEntity(NumberEntity, TWCDeviceEntity):
 
         state = await self.async_get_last_state()
 
-        if state:
+        if state and state.state not in (STATE_UNKNOWN, STATE_UNAVAILABLE):
             self.set_native_value(float(state.state))
 
-        self._twc_device.register_device_data_updated_callback({
-            Commands.TWC_STATUS.name: self.async_write_ha_state,
-            Commands.TWC_METER.name: self.async_write_ha_state,
-        })
+        self._dispatcher = async_get_device_dispatcher(self.hass, self._config_entry, self._twc_device)
+        self._dispatcher.async_add_entity(self)
 
     async def async_will_remove_from_hass(self):
         """When entity will be removed from hass."""
-        self._twc_device.deregister_device_data_updated_callback({
-            Commands.TWC_STATUS.name: self.async_write_ha_state,
-            Commands.TWC_METER.name: self.async_write_ha_state,
-        })
+        await super().async_will_remove_from_hass()
+        if self._dispatcher:
+            self._dispatcher.async_remove_entity(self)
+
+    def dispatch_value(self):
+        """Return the rendered state used by the dispatcher to detect changes."""
+        return self.native_value
+
+    @callback
+    def async_bind_device(self, twc_device: TWCPeripheral):
+        """Move the entity to a new peripheral object, keeping the setpoint."""
+        twc_device.set_setpoint_current(self._twc_device.get_setpoint_current())
+        super().async_bind_device(twc_device)
 
     @property
     def native_min_value(self) -> float:
@@ -145,6 +126,7 @@ class TWCDefaultCurrentEntity(NumberEntity, TWCDeviceEntity):
     async def async_set_native_value(self, value: float) -> None:
         """Update the current value."""
         self._twc_device.set_setpoint_current(int(value * 100))
+        self.async_write_ha_state()
 
     @property
     def native_value(self) -> float:
@@ -156,28 +138,42 @@ class TWCDefaultCurrentEntity(NumberEntity, TWCDeviceEntity):
 
 
 class TWCSessionCurrentEntity(TWCDefaultCurrentEntity):
-    def __init__(self, twc_device: TWCPeripheral, twc_controller: TWCController, entry):
+    def __init__(self, twc_device: TWCPeripheral, entry):
         """Initialize the sensor."""
-        super().__init__(twc_device, twc_controller, entry)
-        self._twc_controller = twc_controller
+        super().__init__(twc_device, entry)
         self._name = f"{self._twc_device.get_serial()} Session Current Setting"
         self._unique_id = f"{self._twc_device.get_serial()}_session_current_setting"
+        self.dispatch_keys = ("current_available",)
+
+    async def async_added_to_hass(self):
+        """When entity is added to hass."""
+        # The state is the current the charger reported, not a setpoint, so it is not restored and sent again
+        await TWCDeviceEntity.async_added_to_hass(self)
+        self._dispatcher = async_get_device_dispatcher(self.hass, self._config_entry, self._twc_device)
+        self._dispatcher.async_add_entity(self)
+        async_get_command_pipeline(self.hass, self._config_entry, self._twc_device)
+
+    @property
+    def device_state_attributes(self):
+        """Return the state attributes."""
+        # Only read here, the pipeline may already be stopped while the entry unloads
+        entry_data = self.hass.data[DOMAIN].get(self._config_entry.entry_id, {})
+        pipeline = entry_data.get("pipelines", {}).get(self._twc_device.get_serial(), None)
+
+        if pipeline is not None:
+            self._attributes["Command Queue Depth"] = pipeline.queue_depth
+            self._attributes["Dropped Commands"] = pipeline.dropped_count
+
+        return self._attributes
 
     def set_native_value(self, value: float) -> None:
         """Update the current value."""
-        if value == 0:
-            asyncio.create_task(self._twc_controller._event_loop.self._twc_controller.queue_peripheral_open_contactors_command(self._twc_device.get_address()))
-        else:
-            asyncio.create_task(self._twc_controller.queue_peripheral_close_contactors_command(self._twc_device.get_address()))
-            asyncio.create_task(self._twc_controller.queue_peripheral_session_current_command(self._twc_device.get_address(), int(value * 100)))
+        pipeline = async_get_command_pipeline(self.hass, self._config_entry, self._twc_device)
+        pipeline.async_set_session_current(int(value * 100))
 
     async def async_set_native_value(self, value: float) -> None:
         """Update the current value."""
-        if value == 0:
-            await self._twc_controller.queue_peripheral_open_contactors_command(self._twc_device.get_address())
-        else:
-            await self._twc_controller.queue_peripheral_close_contactors_command(self._twc_device.get_address())
-            await self._twc_controller.queue_peripheral_session_current_command(self._twc_device.get_address(), int(value * 100))
+        self.set_native_value(value)
 
     @property
     def native_value(self) -> float:
@@ -0,0 +1,115 @@
+"""The Tesla Wall Charger Director integration."""
+import asyncio
+import logging
+import os
+import time
+
+from twcdirector.protocol import TWCProtocol, Commands, MessageType, Markers, ChecksumMismatchError
+
+from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+BY_ID_PATH = "/dev/serial/by-id"
+# Peripherals with no controller on the bus announce themselves about once a second
+PROBE_TIME = 3.0
+READ_TIMEOUT = 0.1
+# Frames a peripheral sends, a controller's frames do not count as a charger
+PERIPHERAL_COMMANDS = (Commands.TWC_PERIPHERAL, Commands.TWC_STATUS)
+
+
+def interface_path(interface):
+    """Return the device path of an interface, entries created from the fixed list hold names under /dev."""
+    return interface if interface.startswith("/") else f"/dev/{interface}"
+
+
+def list_serial_ports():
+    """Return the device path and description of every serial port keyed by the device it resolves to.
+
+    A device with a /dev/serial/by-id link is given that path, it stays the
+    same when USB adapters are numbered in a different order.
+    """
+    from serial.tools import list_ports
+
+    ports = {os.path.realpath(port.device): (port.device, port.description) for port in list_ports.comports()}
+
+    if os.path.isdir(BY_ID_PATH):
+        for name in sorted(os.listdir(BY_ID_PATH)):
+            path = os.path.join(BY_ID_PATH, name)
+            device = os.path.realpath(path)
+            ports[device] = (path, ports[device][1] if device in ports else name)
+
+    return ports
+
+
+def count_peripherals(data):
+    """Return the addresses of the peripherals that sent a valid frame in data, and the number of valid frames."""
+    protocol = TWCProtocol()
+    addresses = set()
+    frame_count = 0
+
+    # Frames are delimited by the start and end markers, the end type byte is left between two frames
+    for segment in bytes(data).split(bytes([Markers.START])):
+        if len(segment) < 6:
+            continue
+
+        message = bytes([Markers.START]) + segment + bytes([Markers.END, Markers.END_TYPE])
+
+        try:
+            message_header, _, _ = protocol.extract_command_data(message)
+        except (KeyError, IndexError, ValueError, ChecksumMismatchError):
+            continue
+
+        frame_count += 1
+
+        if message_header.type == MessageType.TWC_DATA and message_header.command in PERIPHERAL_COMMANDS:
+            addresses.add(message_header.sender)
+
+    return addresses, frame_count
+
+
+def probe_port(path, duration=PROBE_TIME):
+    """Listen on a port for duration seconds, return the number of peripherals heard, None if it can not be opened.
+
+    The port is locked while it is listened to, a port another program
+    holds the lock of is skipped rather than read from under it.
+    """
+    import serial
+
+    data = bytearray()
+
+    try:
+        with serial.Serial(path, 9600, timeout=READ_TIMEOUT, exclusive=True) as port:
+            deadline = time.monotonic() + duration
+
+            while time.monotonic() < deadline:
+                data += port.read(256)
+    except (OSError, serial.SerialException) as error:
+        _LOGGER.debug(f"Probing {path} failed: {error}")
+        return None
+
+    addresses, frame_count = count_peripherals(data)
+    _LOGGER.debug(f"Probing {path} found {frame_count} frames from {len(addresses)} peripherals in {len(data)} bytes")
+
+    return len(addresses)
+
+
+async def async_list_ports(hass: HomeAssistant, exclude=()):
+    """Return the description of every serial port not in exclude keyed by its path.
+
+    exclude holds the interfaces of existing entries, a port is left out
+    whichever path it was configured under.
+    """
+    def resolve():
+        excluded = {os.path.realpath(interface_path(interface)) for interface in exclude}
+        return {path: description for device, (path, description) in list_serial_ports().items()
+                if device not in excluded}
+
+    return await hass.async_add_executor_job(resolve)
+
+
+async def async_probe_ports(hass: HomeAssistant, paths, duration=PROBE_TIME):
+    """Probe the ports in paths at the same time, return the charger count of the ports with chargers."""
+    counts = await asyncio.gather(*[hass.async_add_executor_job(probe_port, path, duration) for path in paths])
+
+    return {path: count for path, count in zip(paths, counts) if count}
@@ -1,34 +1,47 @@
-import asyncio
 import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
 
 from homeassistant.const import (
     CONF_DEVICE_CLASS,
     CONF_FRIENDLY_NAME,
     CONF_UNIT_OF_MEASUREMENT,
     DEVICE_CLASS_ENERGY,
+    DEVICE_CLASS_POWER,
     ENERGY_KILO_WATT_HOUR,
+    POWER_WATT,
+    STATE_UNAVAILABLE,
+    STATE_UNKNOWN,
+    ENTITY_CATEGORY_DIAGNOSTIC,
+    TIME_MILLISECONDS,
+    TIME_SECONDS,
 )
 
 from homeassistant.components.sensor import (
     SensorEntity,
+    SensorEntityDescription,
     ATTR_STATE_CLASS,
     STATE_CLASS_MEASUREMENT,
     STATE_CLASS_TOTAL_INCREASING,
 )
 
 from twcdirector.device import TWCPeripheral
-from twcdirector.protocol import Commands, Status
+from twcdirector.protocol import Status
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.config_entries import ConfigEntry
-
-from homeassistant.helpers.update_coordinator import (
-    CoordinatorEntity,
-)
+from homeassistant.helpers.event import async_call_later
 
 from .device import TWCDeviceEntity
+from .dispatcher import async_get_device_dispatcher, TWCWriteThrottle
+from .command import async_get_command_pipeline
+from .energy import async_get_power_meter, PHASES
 from .const import (
     DOMAIN,
+    DEFAULT_NAME,
+    CONF_RS485_INTERFACES,
     CONF_SCALE,
     CONF_ROUND,
     CONF_FORMAT
@@ -110,28 +123,189 @@ SENSOR_TYPES = {
     }
 }
 
+# Derived from the meter frames by the charger's power meter
+POWER_SENSOR_TYPES = {
+    "power_phase_l1": {
+        CONF_FRIENDLY_NAME: "AC Power Phase 1",
+        CONF_DEVICE_CLASS: DEVICE_CLASS_POWER,
+        CONF_UNIT_OF_MEASUREMENT: POWER_WATT,
+        ATTR_STATE_CLASS: STATE_CLASS_MEASUREMENT
+    },
+    "power_phase_l2": {
+        CONF_FRIENDLY_NAME: "AC Power Phase 2",
+        CONF_DEVICE_CLASS: DEVICE_CLASS_POWER,
+        CONF_UNIT_OF_MEASUREMENT: POWER_WATT,
+        ATTR_STATE_CLASS: STATE_CLASS_MEASUREMENT
+    },
+    "power_phase_l3": {
+        CONF_FRIENDLY_NAME: "AC Power Phase 3",
+        CONF_DEVICE_CLASS: DEVICE_CLASS_POWER,
+        CONF_UNIT_OF_MEASUREMENT: POWER_WATT,
+        ATTR_STATE_CLASS: STATE_CLASS_MEASUREMENT
+    },
+    "power_total": {
+        CONF_FRIENDLY_NAME: "AC Power",
+        CONF_DEVICE_CLASS: DEVICE_CLASS_POWER,
+        CONF_UNIT_OF_MEASUREMENT: POWER_WATT,
+        ATTR_STATE_CLASS: STATE_CLASS_MEASUREMENT
+    },
+    "session_energy": {
+        CONF_FRIENDLY_NAME: "Session Energy",
+        CONF_DEVICE_CLASS: DEVICE_CLASS_ENERGY,
+        CONF_UNIT_OF_MEASUREMENT: ENERGY_KILO_WATT_HOUR,
+        ATTR_STATE_CLASS: STATE_CLASS_TOTAL_INCREASING
+    }
+}
+
+HEALTH_SENSOR_TYPES = {
+    "frame_rate": {
+        CONF_FRIENDLY_NAME: "Frames Received",
+        CONF_UNIT_OF_MEASUREMENT: "frames/s"
+    },
+    "bus_errors": {
+        CONF_FRIENDLY_NAME: "Frame Errors",
+        CONF_UNIT_OF_MEASUREMENT: "frames"
+    },
+    "transmit_queue": {
+        CONF_FRIENDLY_NAME: "Transmit Queue Depth",
+        CONF_UNIT_OF_MEASUREMENT: "messages"
+    },
+    "heartbeat_age": {
+        CONF_FRIENDLY_NAME: "Oldest Peripheral Heartbeat",
+        CONF_UNIT_OF_MEASUREMENT: TIME_SECONDS
+    },
+    "callback_time": {
+        CONF_FRIENDLY_NAME: "Mean Callback Time",
+        CONF_UNIT_OF_MEASUREMENT: TIME_MILLISECONDS
+    },
+    "recoveries": {
+        CONF_FRIENDLY_NAME: "Listener Recoveries",
+        CONF_UNIT_OF_MEASUREMENT: None
+    },
+    "handoff_latency": {
+        CONF_FRIENDLY_NAME: "Listener Handoff Latency",
+        CONF_UNIT_OF_MEASUREMENT: TIME_MILLISECONDS
+    }
+}
+
+# Health sensors of a listener running on its own thread
+THREAD_HEALTH_SENSOR_TYPES = ("handoff_latency",)
+
+
+# Device data keys a sensor depends on when they differ from the sensor's own key
+SENSOR_DISPATCH_KEYS = {
+    "vin": ("vin_h", "vin_m", "vin_l"),
+}
+
+STATUS_NAMES = {status.value: status.name for status in Status}
+
+
+def _compile_renderer(entity_attribute, entity_detail):
+    """Return a function rendering the state of a sensor from its peripheral.
 
-async def new_sensor_processor(device_queue, hass, entry, async_add_entities):
-    while True:
-        new_device: TWCPeripheral = await device_queue.get()
+    The branches on the sensor type, scale, rounding and format are taken
+    once here instead of every time a state is rendered.
+    """
+    if entity_attribute == "vin":
+        return TWCPeripheral.get_vin
 
-        if isinstance(new_device, TWCPeripheral):
-            _LOGGER.debug(f"Got new Tesla Wall Charger Device {new_device.get_address():04x}")
-            sensors = []
+    if entity_attribute == "charge_state":
+        unknown = Status.UNKNOWN.name
 
-            for (entity_attribute, entity_detail) in SENSOR_TYPES.items():
-                sensor = TWCStateSensor(new_device, entry, entity_attribute, entity_detail)
-                sensors.append(sensor)
-                device_registry = hass.helpers.device_registry.async_get(hass)
-                device_info = sensor.device_info
-                device_info["config_entry_id"] = entry.entry_id
-                device = device_registry.async_get_or_create(**device_info)
-                _LOGGER.debug(f"Sensor: {sensor.entity_id} added")
+        def render_status(twc_device):
+            return STATUS_NAMES.get(twc_device.get_device_data().get(entity_attribute, 0), unknown)
 
-            if sensors:
-                async_add_entities(sensors)
+        return render_status
 
-        device_queue.task_done()
+    scale = entity_detail.get(CONF_SCALE, 1)
+    round_digits = entity_detail.get(CONF_ROUND, None)
+    value_format = entity_detail.get(CONF_FORMAT, None)
+
+    if scale == 1 and not round_digits and not value_format:
+        def render_value(twc_device):
+            return twc_device.get_device_data().get(entity_attribute, 0)
+
+        return render_value
+
+    if not round_digits and not value_format:
+        def render_scaled(twc_device):
+            return twc_device.get_device_data().get(entity_attribute, 0) * scale
+
+        return render_scaled
+
+    if not value_format:
+        def render_rounded(twc_device):
+            return round(twc_device.get_device_data().get(entity_attribute, 0) * scale, round_digits)
+
+        return render_rounded
+
+    def render_formatted(twc_device):
+        value = twc_device.get_device_data().get(entity_attribute, 0) * scale
+        return format(round(value, round_digits) if round_digits else value, value_format)
+
+    return render_formatted
+
+
+def _compile_power_renderer(entity_attribute):
+    """Return a function rendering the state of a power or session energy sensor from its charger's power meter."""
+    if entity_attribute == "session_energy":
+        def render_session_energy(meter):
+            return round(meter.session_energy, 3)
+
+        return render_session_energy
+
+    if entity_attribute.startswith("power_phase"):
+        phase = PHASES.index(entity_attribute[-2:])
+
+        def render_phase_power(meter):
+            power = meter.phase_power(phase)
+            return round(power) if power is not None else None
+
+        return render_phase_power
+
+    def render_total_power(meter):
+        power = meter.total_power
+        return round(power) if power is not None else None
+
+    return render_total_power
+
+
+@dataclass(frozen=True)
+class TWCSensorDescription(SensorEntityDescription):
+    """Sensor description shared by one sensor type of every charger, with its state renderer."""
+    render: Callable = None
+    dispatch_keys: tuple = ()
+
+
+def _describe_sensor(entity_attribute, entity_detail, render):
+    return TWCSensorDescription(
+        key=entity_attribute,
+        name=entity_detail[CONF_FRIENDLY_NAME],
+        device_class=entity_detail.get(CONF_DEVICE_CLASS, None),
+        unit_of_measurement=entity_detail[CONF_UNIT_OF_MEASUREMENT],
+        state_class=entity_detail.get(ATTR_STATE_CLASS, None),
+        render=render,
+        dispatch_keys=SENSOR_DISPATCH_KEYS.get(entity_attribute, (entity_attribute,)),
+    )
+
+
+SENSOR_DESCRIPTIONS = tuple(_describe_sensor(entity_attribute, entity_detail,
+                                             _compile_renderer(entity_attribute, entity_detail))
+                            for (entity_attribute, entity_detail) in SENSOR_TYPES.items())
+
+POWER_SENSOR_DESCRIPTIONS = tuple(_describe_sensor(entity_attribute, entity_detail,
+                                                   _compile_power_renderer(entity_attribute))
+                                  for (entity_attribute, entity_detail) in POWER_SENSOR_TYPES.items())
+
+
+def build_sensor_entities(twc_device: TWCPeripheral, entry: ConfigEntry):
+    """Build the sensor entities of a charger."""
+    sensors = [SENSOR_ENTITY_CLASSES.get(description.key, TWCStateSensor)(twc_device, entry, description)
+               for description in SENSOR_DESCRIPTIONS]
+    sensors.extend(TWCPowerSensor(twc_device, entry, description) for description in POWER_SENSOR_DESCRIPTIONS)
+    sensors.append(TWCCommandLatencySensor(twc_device, entry))
+
+    return sensors
 
 
 async def async_setup_platform(hass: HomeAssistant, entry: ConfigEntry, async_add_entities, discovery_info=None):
@@ -146,12 +320,15 @@ async def async_setup_platform(hass: HomeAssistant, entry: ConfigEntry, async_ad
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities):
     """Set up Tesla Wall Charger Director from a config entry."""
 
-    device_queue = asyncio.Queue()
-    twc_listener = hass.data[DOMAIN][entry.entry_id]["twc_listener"]
-
-    twc_listener.register_device_queue(device_queue)
+    health = hass.data[DOMAIN][entry.entry_id]["health"]
+    threaded = hass.data[DOMAIN][entry.entry_id]["supervisor"].threaded
+    async_add_entities([TWCHealthSensor(health, entry, entity_attribute, entity_detail)
+                        for (entity_attribute, entity_detail) in HEALTH_SENSOR_TYPES.items()
+                        if threaded or entity_attribute not in THREAD_HEALTH_SENSOR_TYPES])
 
-    hass.loop.create_task(new_sensor_processor(device_queue, hass, entry, async_add_entities))
+    discovery = hass.data[DOMAIN][entry.entry_id]["discovery"]
+    discovery.async_add_platform("sensor", lambda twc_device: build_sensor_entities(twc_device, entry),
+                                 async_add_entities)
 
     return True
 
@@ -163,43 +340,78 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
 
 class TWCStateSensor(TWCDeviceEntity, SensorEntity):
     """Implementation of a Tesla Wall Charger Director Sensor."""
-    def __init__(self, twc_device: TWCPeripheral, entry, entity_attribute, entity_detail):
+    def __init__(self, twc_device: TWCPeripheral, entry, description: TWCSensorDescription):
         """Initialize the sensor."""
         super().__init__(twc_device)
-        self._entity_attribute = entity_attribute
-        self._entity_detail = entity_detail
-        self._unit_of_measure = entity_detail[CONF_UNIT_OF_MEASUREMENT]
-        self._state_class = entity_detail.get(ATTR_STATE_CLASS, None)
-        self._round = entity_detail.get(CONF_ROUND, None)
-        self._format = entity_detail.get(CONF_FORMAT, None)
-        self._scale = entity_detail.get(CONF_SCALE, None)
-        self._name = f"{self._twc_device.get_serial()} {self._entity_detail[CONF_FRIENDLY_NAME]}"
+        self.entity_description = description
+        self._entity_attribute = description.key
+        self._render = description.render
+        self._name = f"{self._twc_device.get_serial()} {description.name}"
         self._unique_id = f"{self._twc_device.get_serial()}_{self._entity_attribute}"
         self._config_entry = entry
-        self._device_class = entity_detail.get(CONF_DEVICE_CLASS, None)
+        self._dispatcher = None
+        self._unsub_heartbeat = None
+        self.dispatch_throttle = None
+        self.dispatch_keys = description.dispatch_keys
+        self.apply_options(entry.options)
 
     async def async_added_to_hass(self):
         """When entity is added to hass."""
         await super().async_added_to_hass()
-        self._twc_device.register_device_data_updated_callback({
-            Commands.TWC_STATUS.name: self.async_write_ha_state,
-            Commands.TWC_METER.name: self.async_write_ha_state,
-        })
+        self._dispatcher = async_get_device_dispatcher(self.hass, self._config_entry, self._twc_device)
+        self._dispatcher.async_add_entity(self)
+        self._async_schedule_heartbeat()
 
     async def async_will_remove_from_hass(self):
         """When entity will be removed from hass."""
-        self._twc_device.deregister_device_data_updated_callback({
-            Commands.TWC_STATUS.name: self.async_write_ha_state,
-            Commands.TWC_METER.name: self.async_write_ha_state,
-        })
+        await super().async_will_remove_from_hass()
+        self._async_cancel_heartbeat()
+        if self._dispatcher:
+            self._dispatcher.async_remove_entity(self)
+
+    def dispatch_value(self):
+        """Return the rendered state used by the dispatcher to detect changes."""
+        return self.state
+
+    def apply_options(self, options):
+        """Apply the deadband and interval options for this sensor."""
+        self.dispatch_throttle = TWCWriteThrottle.from_options(options.get(self._entity_attribute))
+
+        if self._dispatcher:
+            self._async_schedule_heartbeat()
+
+    @callback
+    def _async_schedule_heartbeat(self):
+        """Wake up when the last write will be older than the throttle's maximum interval."""
+        self._async_cancel_heartbeat()
+        stale_in = self.dispatch_throttle.stale_in(time.monotonic()) if self.dispatch_throttle else None
+
+        if stale_in is not None:
+            self._unsub_heartbeat = async_call_later(self.hass, max(stale_in, 0), self._async_heartbeat)
+
+    @callback
+    def _async_cancel_heartbeat(self):
+        if self._unsub_heartbeat:
+            self._unsub_heartbeat()
+            self._unsub_heartbeat = None
+
+    @callback
+    def _async_heartbeat(self, now=None):
+        self._unsub_heartbeat = None
+
+        # Written since the heartbeat was scheduled, it is due later
+        if self.dispatch_throttle.stale_in(time.monotonic()) <= 0:
+            self._dispatcher.async_force_write(self)
+
+        self._async_schedule_heartbeat()
 
     @property
     def device_class(self):
-        return self._device_class
+        return self.entity_description.device_class
 
     @property
     def state_class(self):
-        return self._state_class
+        return self.entity_description.state_class
 
     @property
     def device_state_attributes(self):
@@ -219,20 +431,300 @@ class TWCStateSensor(TWCDeviceEntity, SensorEntity):
     @property
     def state(self):
         """Return the state of the sensor."""
-        if self._entity_attribute == "vin":
-            self._state = self._twc_device.get_vin()
-        elif self._entity_attribute == "charge_state":
-            self._state = Status(self._twc_device.get_device_data().get(self._entity_attribute, 0)).name
-        else:
-            self._state = self._twc_device.get_device_data().get(self._entity_attribute, 0) * self._scale
+        return self._render(self._twc_device)
+
+    @property
+    def should_poll(self) -> bool:
+        return False
 
-            if self._round:
-                self._state = round(self._state, self._round)
+    @property
+    def unit_of_measurement(self):
+        return self.entity_description.unit_of_measurement
+
+
+class TWCTotalEnergySensor(TWCStateSensor):
+    """The charger's total energy, guarded against resets by the charger's power meter.
+
+    The meter checks a new reading in its own frame callback, so the
+    sensor is dispatched when the meter updates rather than when the
+    reading changes.
+    """
+    def __init__(self, twc_device: TWCPeripheral, entry, description: TWCSensorDescription):
+        """Initialize the sensor."""
+        super().__init__(twc_device, entry, description)
+        self.dispatch_keys = ()
+        self._meter = None
+        self._remove_listener = None
+
+    async def async_added_to_hass(self):
+        """When entity is added to hass."""
+        self._meter = async_get_power_meter(self.hass, self._config_entry, self._twc_device)
+        state = await self.async_get_last_state()
 
-        if self._format:
-            return f"{self._state:{self._format}}"
-        else:
-            return self._state
+        if state and state.state not in (STATE_UNKNOWN, STATE_UNAVAILABLE):
+            self._meter.async_restore_total_energy(float(state.state))
+
+        await super().async_added_to_hass()
+        self._remove_listener = self._meter.async_add_listener(self._async_meter_updated)
+
+    async def async_will_remove_from_hass(self):
+        """When entity will be removed from hass."""
+        await super().async_will_remove_from_hass()
+        if self._remove_listener:
+            self._remove_listener()
+
+    @callback
+    def _async_meter_updated(self):
+        if self._dispatcher:
+            self._dispatcher.async_dispatch_entity(self)
+
+    @property
+    def available(self):
+        return self._meter is not None and self._meter.total_energy is not None
+
+    @property
+    def device_state_attributes(self):
+        """Return the state attributes."""
+        if self._meter:
+            self._attributes["Rejected Samples"] = self._meter.rejected_count
+        return self._attributes
+
+    @property
+    def state(self):
+        """Return the last good total energy."""
+        if self._meter is None:
+            return None
+
+        return self._meter.total_energy
+
+
+# Sensors needing more than their description's renderer
+SENSOR_ENTITY_CLASSES = {
+    "total_kwh": TWCTotalEnergySensor,
+}
+
+
+class TWCPowerSensor(TWCDeviceEntity, SensorEntity):
+    """Power or session energy derived from a charger's meter frames."""
+    def __init__(self, twc_device: TWCPeripheral, entry, description: TWCSensorDescription):
+        """Initialize the sensor."""
+        super().__init__(twc_device)
+        self.entity_description = description
+        self._entity_attribute = description.key
+        self._render = description.render
+        self._name = f"{self._twc_device.get_serial()} {description.name}"
+        self._unique_id = f"{self._twc_device.get_serial()}_{self._entity_attribute}"
+        self._config_entry = entry
+        self._meter = None
+        self._remove_listener = None
+        self._written = None
+
+    async def async_added_to_hass(self):
+        """When entity is added to hass."""
+        await super().async_added_to_hass()
+        self._meter = async_get_power_meter(self.hass, self._config_entry, self._twc_device)
+
+        if self._entity_attribute == "session_energy":
+            state = await self.async_get_last_state()
+
+            if state and state.state not in (STATE_UNKNOWN, STATE_UNAVAILABLE):
+                session_started = state.attributes.get("Session Started", None)
+                self._meter.async_restore_session(
+                    float(state.state),
+                    datetime.fromisoformat(session_started).timestamp() if session_started else None,
+                    state.attributes.get("Session VIN", None),
+                    state.attributes.get("Session Peak Current", 0.0),
+                    state.attributes.get("Session Charge", 0.0),
+                    state.attributes.get("Session Charging Time", 0.0))
+
+        self._remove_listener = self._meter.async_add_listener(self._async_meter_updated)
+
+    async def async_will_remove_from_hass(self):
+        """When entity will be removed from hass."""
+        await super().async_will_remove_from_hass()
+        if self._remove_listener:
+            self._remove_listener()
+
+    @callback
+    def _async_meter_updated(self):
+        # The session attributes change without the session energy, a new car or more charge delivered
+        written = (self.state, dict(self.device_state_attributes))
+
+        if written != self._written:
+            self._written = written
+            self.async_write_ha_state()
+
+    @property
+    def device_class(self):
+        return self.entity_description.device_class
+
+    @property
+    def state_class(self):
+        return self.entity_description.state_class
+
+    @property
+    def device_state_attributes(self):
+        """Return the state attributes."""
+        if self._entity_attribute == "session_energy" and self._meter and self._meter.session_started:
+            self._attributes["Session Started"] = datetime.fromtimestamp(self._meter.session_started).isoformat()
+            self._attributes["Session VIN"] = self._meter.session_vin
+            self._attributes["Session Peak Current"] = self._meter.session_peak_current
+            self._attributes["Session Charge"] = round(self._meter.session_charge, 3)
+            self._attributes["Session Charging Time"] = round(self._meter.session_charging_time)
+        return self._attributes
+
+    @property
+    def unique_id(self):
+        """Return the unique id."""
+        return self._unique_id
+
+    @property
+    def name(self):
+        """Return the name of the entity."""
+        return self._name
+
+    @property
+    def state(self):
+        """Return the power in watts or the session energy in kWh."""
+        if self._meter is None:
+            return None
+
+        return self._render(self._meter)
+
+    @property
+    def unit_of_measurement(self):
+        return self.entity_description.unit_of_measurement
+
+
+class TWCCommandLatencySensor(TWCDeviceEntity, SensorEntity):
+    """Time from sending a current setpoint to a status frame confirming it."""
+    def __init__(self, twc_device: TWCPeripheral, entry):
+        """Initialize the sensor."""
+        super().__init__(twc_device)
+        self._name = f"{self._twc_device.get_serial()} Command Latency"
+        self._unique_id = f"{self._twc_device.get_serial()}_command_latency"
+        self._config_entry = entry
+        self._pipeline = None
+        self._remove_listener = None
+
+    async def async_added_to_hass(self):
+        """When entity is added to hass."""
+        await super().async_added_to_hass()
+        self._pipeline = async_get_command_pipeline(self.hass, self._config_entry, self._twc_device)
+        self._remove_listener = self._pipeline.async_add_listener(self.async_write_ha_state)
+
+    async def async_will_remove_from_hass(self):
+        """When entity will be removed from hass."""
+        await super().async_will_remove_from_hass()
+        if self._remove_listener:
+            self._remove_listener()
+
+    @property
+    def device_state_attributes(self):
+        """Return the state attributes."""
+        if self._pipeline:
+            latency = self._pipeline.latency
+            p50 = latency.percentile(50)
+            p95 = latency.percentile(95)
+            self._attributes["p50"] = round(p50 * 1000) if p50 is not None else None
+            self._attributes["p95"] = round(p95 * 1000) if p95 is not None else None
+            self._attributes["Samples"] = latency.count
+            self._attributes["Retries"] = self._pipeline.retry_count
+            self._attributes["Timeouts"] = self._pipeline.timeout_count
+        return self._attributes
+
+    @property
+    def unique_id(self):
+        """Return the unique id."""
+        return self._unique_id
+
+    @property
+    def name(self):
+        """Return the name of the entity."""
+        return self._name
+
+    @property
+    def entity_category(self):
+        return ENTITY_CATEGORY_DIAGNOSTIC
+
+    @property
+    def state_class(self):
+        return STATE_CLASS_MEASUREMENT
+
+    @property
+    def state(self):
+        """Return the last confirmation latency in milliseconds."""
+        if self._pipeline is None or self._pipeline.latency.last is None:
+            return None
+
+        return round(self._pipeline.latency.last * 1000)
+
+    @property
+    def unit_of_measurement(self):
+        return TIME_MILLISECONDS
+
+
+class TWCHealthSensor(SensorEntity):
+    """Bus and integration health published by the entry's health monitor."""
+    def __init__(self, health, entry, entity_attribute, entity_detail):
+        """Initialize the sensor."""
+        self._health = health
+        self._entity_attribute = entity_attribute
+        self._interface = ", ".join(entry.data.get(CONF_RS485_INTERFACES, []))
+        self._name = f"{self._interface} {entity_detail[CONF_FRIENDLY_NAME]}"
+        self._unique_id = f"{entry.entry_id}_{entity_attribute}"
+        self._unit_of_measure = entity_detail[CONF_UNIT_OF_MEASUREMENT]
+        self._device_id = entry.entry_id
+        self._remove_listener = None
+
+    async def async_added_to_hass(self):
+        """When entity is added to hass."""
+        await super().async_added_to_hass()
+        self._remove_listener = self._health.async_add_listener(self.async_write_ha_state)
+
+    async def async_will_remove_from_hass(self):
+        """When entity will be removed from hass."""
+        await super().async_will_remove_from_hass()
+        if self._remove_listener:
+            self._remove_listener()
+
+    @property
+    def device_info(self):
+        """Return the device_info of the bus."""
+        return {
+            "identifiers": {(DOMAIN, self._device_id)},
+            "name": f"Tesla Wall Charger Bus {self._interface}",
+            "manufacturer": DEFAULT_NAME,
+            "model": "RS485 Bus",
+        }
+
+    @property
+    def device_state_attributes(self):
+        """Return the state attributes."""
+        return self._health.data.get(self._entity_attribute, (None, {}))[1]
+
+    @property
+    def unique_id(self):
+        """Return the unique id."""
+        return self._unique_id
+
+    @property
+    def name(self):
+        """Return the name of the entity."""
+        return self._name
+
+    @property
+    def entity_category(self):
+        return ENTITY_CATEGORY_DIAGNOSTIC
+
+    @property
+    def state_class(self):
+        return STATE_CLASS_MEASUREMENT
+
+    @property
+    def state(self):
+        """Return the value published at the last health interval."""
+        return self._health.data.get(self._entity_attribute, (None, {}))[0]
 
     @property
     def should_poll(self) -> bool:
@@ -240,5 +732,4 @@ class TWCStateSensor(TWCDeviceEntity, SensorEntity):
 
     @property
     def unit_of_measurement(self):
-        return  self._unit_of_measure
-
+        return self._unit_of_measure
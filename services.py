@@ -0,0 +1,133 @@
+"""The Tesla Wall Charger Director integration."""
+import asyncio
+import logging
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, callback
+from homeassistant.exceptions import HomeAssistantError
+
+from .command import async_get_command_pipeline
+from .dispatcher import async_get_device_dispatcher
+from .const import (
+    DOMAIN
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_SET_CURRENTS = "set_currents"
+
+ATTR_CURRENTS = "currents"
+ATTR_CURRENT_TYPE = "current_type"
+CURRENT_TYPE_SESSION = "session"
+CURRENT_TYPE_DEFAULT = "default"
+
+SET_CURRENTS_SCHEMA = vol.Schema({
+    vol.Required(ATTR_CURRENTS): {str: vol.All(vol.Coerce(float), vol.Range(min=0))},
+    vol.Optional(ATTR_CURRENT_TYPE, default=CURRENT_TYPE_SESSION): vol.In([CURRENT_TYPE_SESSION, CURRENT_TYPE_DEFAULT]),
+})
+
+
+def _find_bus(hass: HomeAssistant, serial):
+    """Return the entry id and peripheral of a charger."""
+    for entry_id, entry_data in hass.data[DOMAIN].items():
+        discovery = entry_data.get("discovery", None)
+        twc_device = discovery.get_devices().get(serial, None) if discovery else None
+
+        if twc_device is not None:
+            return entry_id, twc_device
+
+    raise HomeAssistantError(f"Unknown charger {serial}")
+
+
+def _validate_bus(hass: HomeAssistant, entry_id, currents, current_type):
+    """Check a bus's requested currents in 100ths of an amp against each charger and the shared limit."""
+    entry_data = hass.data[DOMAIN][entry_id]
+    discovery = entry_data["discovery"]
+    balancer = entry_data["balancer"]
+
+    if current_type == CURRENT_TYPE_SESSION and balancer.is_running:
+        raise HomeAssistantError("Session currents are allocated by load balancing on this bus")
+
+    for twc_device, current in currents.values():
+        if current_type == CURRENT_TYPE_SESSION and not discovery.is_live_device(twc_device):
+            raise HomeAssistantError(f"Charger {twc_device.get_serial()} is not on the bus")
+
+        if current > twc_device.get_max_current():
+            raise HomeAssistantError(f"{current / 100} A is above the maximum current "
+                                     f"{twc_device.get_max_current() / 100} A of {twc_device.get_serial()}")
+
+    # Chargers left out of the batch keep drawing what they are allowed now
+    total = 0
+    for serial, twc_device in discovery.get_devices().items():
+        if serial in currents:
+            total += currents[serial][1]
+        elif current_type == CURRENT_TYPE_DEFAULT:
+            total += twc_device.get_setpoint_current()
+        elif discovery.is_live_device(twc_device):
+            total += twc_device.get_status_current_available()
+
+    if total > balancer.shared_max_current:
+        raise HomeAssistantError(f"{total / 100} A in total is above the shared maximum current "
+                                 f"{balancer.shared_max_current / 100} A")
+
+
+async def _async_send_session_currents(hass: HomeAssistant, entry_id, currents):
+    """Queue the decreases for the bus before any increase so the shared limit holds while they land."""
+    entry = hass.config_entries.async_get_entry(entry_id)
+    decreases = []
+    increases = []
+
+    for twc_device, current in currents.values():
+        pipeline = async_get_command_pipeline(hass, entry, twc_device)
+
+        if current < twc_device.get_status_current_available():
+            decreases.append(pipeline.async_send_session_current(current))
+        else:
+            increases.append(pipeline.async_send_session_current(current))
+
+    await asyncio.gather(*decreases)
+    await asyncio.gather(*increases)
+
+
+def _set_default_currents(hass: HomeAssistant, entry_id, currents):
+    entry = hass.config_entries.async_get_entry(entry_id)
+
+    for twc_device, current in currents.values():
+        twc_device.set_setpoint_current(current)
+        async_get_device_dispatcher(hass, entry, twc_device).async_refresh()
+
+
+async def async_set_currents(hass: HomeAssistant, call: ServiceCall):
+    """Validate the currents of every charger in the call before any of them is changed."""
+    current_type = call.data[ATTR_CURRENT_TYPE]
+    buses = {}
+
+    for serial, amps in call.data[ATTR_CURRENTS].items():
+        entry_id, twc_device = _find_bus(hass, serial)
+        buses.setdefault(entry_id, {})[serial] = (twc_device, int(round(amps * 100)))
+
+    for entry_id, currents in buses.items():
+        _validate_bus(hass, entry_id, currents, current_type)
+
+    for entry_id, currents in buses.items():
+        if current_type == CURRENT_TYPE_DEFAULT:
+            _set_default_currents(hass, entry_id, currents)
+        else:
+            await _async_send_session_currents(hass, entry_id, currents)
+
+
+@callback
+def async_register_services(hass: HomeAssistant):
+    if hass.services.has_service(DOMAIN, SERVICE_SET_CURRENTS):
+        return
+
+    async def async_handle_set_currents(call: ServiceCall):
+        await async_set_currents(hass, call)
+
+    hass.services.async_register(DOMAIN, SERVICE_SET_CURRENTS, async_handle_set_currents, schema=SET_CURRENTS_SCHEMA)
+
+
+@callback
+def async_remove_services(hass: HomeAssistant):
+    hass.services.async_remove(DOMAIN, SERVICE_SET_CURRENTS)
@@ -0,0 +1,79 @@
+"""The Tesla Wall Charger Director integration."""
+import logging
+from datetime import datetime
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    DOMAIN
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+SAVE_DELAY = 10
+# Oldest sessions are dropped beyond this, a few years of daily charging for a handful of chargers
+MAX_SESSIONS = 5000
+
+
+class TWCSessionLog:
+    """Persisted log of completed charging sessions for a config entry.
+
+    A summary is appended by the charger's power meter when the car
+    disconnects, so usage and cost per vehicle can be reported from the
+    log instead of from the recorded states of every frame. Each summary
+    is a flat record of the serial, VIN, start and end, duration, charging
+    time, energy and the peak and mean current delivered while charging.
+    """
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.sessions")
+        self._sessions = []
+        self._dirty = False
+
+    async def async_load(self):
+        data = await self._store.async_load()
+
+        if data:
+            self._sessions = data.get("sessions", [])
+
+        _LOGGER.debug(f"Loaded {len(self._sessions)} sessions from the session log")
+
+    async def async_stop(self):
+        # Save now rather than leave a delayed save behind the unloaded entry
+        if self._dirty:
+            await self._store.async_save(self._data_to_save())
+
+    @property
+    def sessions(self):
+        return self._sessions
+
+    @callback
+    def async_append(self, serial, vin, started, ended, charging_time, energy, peak_current, charge):
+        """Append a completed session, times are POSIX timestamps and the charge is in ampere hours."""
+        duration = ended - started
+        summary = {
+            "serial": serial,
+            "vin": vin,
+            "started": datetime.fromtimestamp(started).isoformat(),
+            "ended": datetime.fromtimestamp(ended).isoformat(),
+            "duration": round(duration),
+            "charging_time": round(charging_time),
+            "energy": round(energy, 3),
+            "peak_current": round(peak_current, 2),
+            "mean_current": round(charge * 3600 / charging_time, 2) if charging_time else 0.0,
+        }
+
+        self._sessions.append(summary)
+        del self._sessions[:-MAX_SESSIONS]
+        self._dirty = True
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+        _LOGGER.debug(f"Session of {vin} on {serial} completed: {summary}")
+
+        return summary
+
+    @callback
+    def _data_to_save(self):
+        self._dirty = False
+        return {"sessions": self._sessions}
@@ -0,0 +1,242 @@
+"""The Tesla Wall Charger Director integration."""
+import logging
+import time
+
+from homeassistant.const import (
+    ATTR_UNIT_OF_MEASUREMENT,
+    POWER_KILO_WATT,
+    STATE_UNAVAILABLE,
+    STATE_UNKNOWN
+)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.helpers.event import async_call_later, async_track_state_change_event
+
+from .balancer import TWCLoadBalancer
+from .const import (
+    CONF_SOLAR_SENSOR,
+    CONF_SOLAR_VOLTAGE,
+    CONF_SOLAR_PHASES,
+    CONF_SOLAR_HYSTERESIS,
+    CONF_SOLAR_RAMP,
+    CONF_SOLAR_INTERVAL,
+    CONF_SOLAR_SUSTAIN,
+    DEFAULT_SOLAR_VOLTAGE,
+    DEFAULT_SOLAR_PHASES,
+    DEFAULT_SOLAR_HYSTERESIS,
+    DEFAULT_SOLAR_RAMP,
+    DEFAULT_SOLAR_INTERVAL,
+    DEFAULT_SOLAR_SUSTAIN
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TWCSolarFollower:
+    """Share only the surplus power reported by a power sensor between the chargers.
+
+    The sensor reports the power exported to the grid in W or kW, positive
+    when exporting. The current the chargers could draw is the current they
+    deliver plus the exported power divided by the supply voltage and
+    phases. It is handed to the load balancer as the shared limit, which
+    allocates it and sends the commands through the command pipelines.
+
+    The limit is updated at most once every solar_interval seconds and only
+    when it moves by more than solar_hysteresis amps. Increases are ramped
+    by at most solar_ramp amps per second and solar_interval seconds worth
+    in one step, decreases apply at once so the chargers do not import
+    from the grid. Charging only starts after a
+    surplus above the lowest start current and stops after a deficit below
+    it, each sustained for solar_sustain seconds. While a deficit is not yet
+    sustained the start current is kept. A surplus already reported when
+    the follower starts is shared at once.
+    """
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, balancer: TWCLoadBalancer):
+        self._hass = hass
+        self._entry = entry
+        self._balancer = balancer
+        self._sensor = None
+        self._voltage = DEFAULT_SOLAR_VOLTAGE
+        self._phases = DEFAULT_SOLAR_PHASES
+        self._hysteresis = int(DEFAULT_SOLAR_HYSTERESIS * 100)
+        self._ramp = int(DEFAULT_SOLAR_RAMP * 100)
+        self._interval = DEFAULT_SOLAR_INTERVAL
+        self._sustain = DEFAULT_SOLAR_SUSTAIN
+        self._target = None
+        self._available = None
+        self._last_update = None
+        self._surplus_since = None
+        self._deficit_since = None
+        self._unsub_state = None
+        self._unsub_update = None
+        self._update_count = 0
+
+    def apply_options(self, options):
+        self._sensor = options.get(CONF_SOLAR_SENSOR, None)
+        self._voltage = options.get(CONF_SOLAR_VOLTAGE, DEFAULT_SOLAR_VOLTAGE)
+        self._phases = options.get(CONF_SOLAR_PHASES, DEFAULT_SOLAR_PHASES)
+        self._hysteresis = int(options.get(CONF_SOLAR_HYSTERESIS, DEFAULT_SOLAR_HYSTERESIS) * 100)
+        self._ramp = int(options.get(CONF_SOLAR_RAMP, DEFAULT_SOLAR_RAMP) * 100)
+        self._interval = options.get(CONF_SOLAR_INTERVAL, DEFAULT_SOLAR_INTERVAL)
+        self._sustain = options.get(CONF_SOLAR_SUSTAIN, DEFAULT_SOLAR_SUSTAIN)
+
+    def start(self):
+        # A surplus the sensor already reports is shared at once, setting up or reloading the entry does not
+        # stop the cars charging from it. Otherwise nothing is shared until a surplus has been sustained.
+        target = self._read_target(self._hass.states.get(self._sensor))
+
+        if target is not None and target >= self._balancer.start_current():
+            self._available = target
+            self._last_update = time.monotonic()
+        else:
+            self._available = 0
+
+        self._target = target
+        self._balancer.set_available_current(self._available)
+        self._unsub_state = async_track_state_change_event(self._hass, [self._sensor], self._async_sensor_changed)
+
+        if target is not None:
+            self._async_schedule()
+
+    def stop(self):
+        if self._unsub_state:
+            self._unsub_state()
+            self._unsub_state = None
+
+        if self._unsub_update:
+            self._unsub_update()
+            self._unsub_update = None
+
+        self._target = None
+        self._available = None
+        self._surplus_since = None
+        self._deficit_since = None
+        self._balancer.set_available_current(None)
+
+    @property
+    def is_running(self):
+        return self._unsub_state is not None
+
+    @property
+    def sensor(self):
+        return self._sensor
+
+    @property
+    def available_current(self):
+        return self._available
+
+    @property
+    def update_count(self):
+        return self._update_count
+
+    @callback
+    def _async_sensor_changed(self, event):
+        self._async_read_state(event.data.get("new_state"))
+
+    @callback
+    def _async_read_state(self, state):
+        target = self._read_target(state)
+
+        if target is None:
+            return
+
+        self._target = target
+        self._async_schedule()
+
+    def _read_target(self, state):
+        """Return the current in 100ths of an amp the chargers could draw from the surplus in state."""
+        if state is None or state.state in (STATE_UNKNOWN, STATE_UNAVAILABLE):
+            return None
+
+        try:
+            power = float(state.state)
+        except ValueError:
+            _LOGGER.debug(f"Ignoring non numeric power {state.state} from {self._sensor}")
+            return None
+
+        if state.attributes.get(ATTR_UNIT_OF_MEASUREMENT) == POWER_KILO_WATT:
+            power *= 1000
+
+        surplus_current = int(power / (self._voltage * self._phases) * 100)
+        return max(0, self._balancer.delivered_current() + surplus_current)
+
+    @callback
+    def _async_schedule(self, delay=None):
+        if self._unsub_update:
+            return
+
+        if delay is None:
+            now = time.monotonic()
+
+            if self._last_update is None or now - self._last_update >= self._interval:
+                self._async_update()
+                return
+
+            delay = self._interval - (now - self._last_update)
+
+        self._unsub_update = async_call_later(self._hass, delay, self._async_update_later)
+
+    @callback
+    def _async_update_later(self, now=None):
+        self._unsub_update = None
+        self._async_update()
+
+    @callback
+    def _async_update(self):
+        if self._target is None:
+            return
+
+        now = time.monotonic()
+        target = self._target
+        available = self._available
+        start_current = self._balancer.start_current()
+        charging = available >= start_current
+
+        if target >= start_current:
+            self._deficit_since = None
+
+            if not charging:
+                if self._surplus_since is None:
+                    self._surplus_since = now
+
+                if now - self._surplus_since < self._sustain:
+                    self._async_schedule(self._sustain - (now - self._surplus_since))
+                    return
+
+                target = start_current
+        else:
+            self._surplus_since = None
+
+            if charging:
+                if self._deficit_since is None:
+                    self._deficit_since = now
+
+                if now - self._deficit_since < self._sustain:
+                    self._async_schedule(self._sustain - (now - self._deficit_since))
+                    target = start_current
+                else:
+                    target = 0
+            else:
+                target = 0
+
+        if charging and target:
+            if abs(target - available) < self._hysteresis:
+                return
+
+            if target > available and self._last_update is not None:
+                # A step covers at most one interval, the time the limit was steady does not add up
+                step_time = min(now - self._last_update, self._interval)
+                target = min(target, available + int(self._ramp * step_time))
+
+                # Carry on ramping without waiting for the sensor to change
+                if target < self._target:
+                    self._async_schedule(self._interval)
+
+        if target == self._available:
+            return
+
+        _LOGGER.debug(f"Solar surplus allows {target}, was {self._available}")
+        self._last_update = now
+        self._update_count += 1
+        self._available = target
+        self._balancer.set_available_current(target)
@@ -0,0 +1,270 @@
+"""The Tesla Wall Charger Director integration."""
+import asyncio
+import logging
+import time
+from datetime import timedelta
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.helpers.event import async_track_time_interval
+
+from .const import (
+    DOMAIN
+)
+from .listener import (
+    TWCDirectorListener,
+    DIRECTION_RECEIVE
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+CHECK_INTERVAL = timedelta(seconds=10)
+# Seconds without a received frame before a bus that was talking is considered stalled
+STALL_TIMEOUT = 30
+SHUTDOWN_TIMEOUT = 5
+BACKOFF_INITIAL = 1
+BACKOFF_MAX = 60
+
+# Entry data bound to the new listener after a recovery, the entry wide consumers follow every bus
+LISTENER_CONSUMERS = ("discovery", "health")
+BUS_LISTENER_CONSUMERS = ("traffic_recorder", "capture")
+
+
+class TWCBus:
+    """The listener of one RS485 interface and the state the supervisor watches it with."""
+    def __init__(self, interface, listener_factory):
+        self.interface = interface
+        self.listener_factory = listener_factory
+        self.twc_listener: TWCDirectorListener = None
+        self.tasks = []
+        self.last_frame = None
+        self.failed = None
+        self.failure_reason = None
+        self.recovery_task = None
+        self.remove_observer = None
+
+
+class TWCListenerSupervisor:
+    """Run the listener tasks of every bus of an entry and recover a bus when they fail.
+
+    Each interface of the entry has its own listener. The listen and
+    transmit tasks are watched for exiting and the received frames for a
+    stall, a bus that was talking and has been silent for STALL_TIMEOUT
+    seconds, by one check shared by all the buses. Either shuts that bus's
+    listener down and opens its interface again, retrying with exponential
+    backoff up to BACKOFF_MAX seconds, while the other buses carry on. The
+    new listener replaces the old one in the entry data and is bound to
+    every consumer, the chargers it rediscovers are bound to their existing
+    entities by the discovery coordinator.
+
+    The time from detecting the failure to the first frame received by the
+    new listener is recorded by the health monitor.
+
+    Given a listener thread, every listener runs its tasks on the thread's
+    loop and the thread is stopped with the supervisor.
+    """
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, listener_factories, listener_thread=None):
+        self._hass = hass
+        self._entry = entry
+        self._listener_thread = listener_thread
+        self._buses = {interface: TWCBus(interface, listener_factory)
+                       for interface, listener_factory in listener_factories.items()}
+        self._unsub_check = None
+        self._running = False
+
+    @property
+    def twc_listeners(self):
+        """Return the listener of every bus keyed by interface."""
+        return {interface: bus.twc_listener for interface, bus in self._buses.items()}
+
+    @property
+    def threaded(self):
+        return self._listener_thread is not None
+
+    def listener_for(self, twc_device) -> TWCDirectorListener:
+        """Return the listener of the bus twc_device was discovered on, None if it is on none of them."""
+        for bus in self._buses.values():
+            if bus.twc_listener and bus.twc_listener.get_device_list().get(twc_device.get_address()) is twc_device:
+                return bus.twc_listener
+
+        return None
+
+    async def async_start(self):
+        """Open every interface and start the listener tasks, raises if an interface can not be opened."""
+        self._running = True
+
+        if self._listener_thread:
+            self._listener_thread.start()
+
+        try:
+            for bus in self._buses.values():
+                self._start_listener(bus, await self._async_new_listener(bus))
+        except Exception:
+            # Close the interfaces already opened so a retried setup can open them again
+            await self.async_stop()
+            raise
+
+        self._unsub_check = async_track_time_interval(self._hass, self._async_check, CHECK_INTERVAL)
+
+    async def async_stop(self):
+        self._running = False
+
+        if self._unsub_check:
+            self._unsub_check()
+            self._unsub_check = None
+
+        recovery_tasks = [bus.recovery_task for bus in self._buses.values() if bus.recovery_task]
+
+        for task in recovery_tasks:
+            task.cancel()
+
+        await asyncio.gather(*recovery_tasks, return_exceptions=True)
+
+        for bus in self._buses.values():
+            bus.recovery_task = None
+
+        await asyncio.gather(*[self._async_stop_listener(bus) for bus in self._buses.values()])
+
+        if self._listener_thread:
+            await self._listener_thread.async_stop(self._hass)
+
+    async def _async_new_listener(self, bus: TWCBus):
+        if self._listener_thread:
+            # The listener's queues and events belong to the loop they are created on
+            return await self._listener_thread.async_call(bus.listener_factory)
+
+        return bus.listener_factory()
+
+    def _create_task(self, coro):
+        if self._listener_thread:
+            return self._listener_thread.create_task(coro)
+
+        return self._hass.loop.create_task(coro)
+
+    def _start_listener(self, bus: TWCBus, twc_listener: TWCDirectorListener):
+        bus.twc_listener = twc_listener
+        bus.last_frame = None
+        bus.remove_observer = twc_listener.add_frame_observer(
+            lambda direction, timestamp, frame: self._frame_observer(bus, direction, timestamp))
+        bus.tasks = [
+            self._create_task(twc_listener.process_transmit_messages()),
+            self._create_task(twc_listener.listen()),
+        ]
+
+        for task in bus.tasks:
+            task.add_done_callback(lambda task: self._task_done(bus, task))
+
+    async def _async_stop_listener(self, bus: TWCBus):
+        tasks = bus.tasks
+        bus.tasks = []
+
+        if bus.remove_observer:
+            bus.remove_observer()
+            bus.remove_observer = None
+
+        # A listener stopped by a recovery that is still waiting to reopen the interface
+        if bus.twc_listener is None or not tasks:
+            return
+
+        try:
+            # Shutdown waits for both tasks to finish, a task that already died would keep it waiting
+            await asyncio.wait_for(self._create_task(bus.twc_listener.shutdown()), SHUTDOWN_TIMEOUT)
+        except asyncio.TimeoutError:
+            _LOGGER.warning(f"Listener on {bus.interface} did not shut down cleanly")
+
+        # Shutdown stops the device message processors but leaves the controller's scheduler to its next wake up
+        twc_controller = bus.twc_listener.get_fake_controller()
+        controller_task = getattr(twc_controller, "_controller_task", None)
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        # The controller's task belongs to the listener's loop, it is cancelled there
+        if controller_task:
+            await self._create_task(_async_cancel(controller_task))
+
+    def _frame_observer(self, bus: TWCBus, direction, timestamp):
+        if direction != DIRECTION_RECEIVE:
+            return
+
+        bus.last_frame = timestamp
+
+        if bus.failed is not None:
+            recovery_time = timestamp - bus.failed
+            bus.failed = None
+            _LOGGER.info(f"Bus {bus.interface} recovered after {recovery_time:.1f} seconds")
+
+            health = self._hass.data[DOMAIN].get(self._entry.entry_id, {}).get("health", None)
+            if health:
+                health.record_recovery(recovery_time, f"{bus.interface}: {bus.failure_reason}")
+
+    def _task_done(self, bus: TWCBus, task):
+        if not self._running or task not in bus.tasks:
+            return
+
+        if task.cancelled():
+            reason = "listener task cancelled"
+        elif task.exception():
+            reason = f"listener task failed: {task.exception()!r}"
+        else:
+            reason = "listener task exited"
+
+        self._async_recover(bus, reason)
+
+    @callback
+    def _async_check(self, now=None):
+        for bus in self._buses.values():
+            if bus.last_frame is not None and time.monotonic() - bus.last_frame > STALL_TIMEOUT:
+                self._async_recover(bus, f"no frames received for {STALL_TIMEOUT} seconds")
+
+    @callback
+    def _async_recover(self, bus: TWCBus, reason):
+        if bus.recovery_task is not None and not bus.recovery_task.done():
+            return
+
+        _LOGGER.warning(f"Restarting the listener on {bus.interface}, {reason}")
+        bus.failed = time.monotonic()
+        bus.failure_reason = reason
+        bus.recovery_task = self._hass.loop.create_task(self._recover(bus))
+
+    async def _recover(self, bus: TWCBus):
+        await self._async_stop_listener(bus)
+        backoff = BACKOFF_INITIAL
+
+        while self._running:
+            await asyncio.sleep(backoff)
+
+            try:
+                twc_listener = await self._async_new_listener(bus)
+            except Exception as error:
+                backoff = min(backoff * 2, BACKOFF_MAX)
+                _LOGGER.warning(f"Reopening {bus.interface} failed, retrying in {backoff} seconds: {error}")
+                continue
+
+            self._start_listener(bus, twc_listener)
+            self._async_bind_listener(bus, twc_listener)
+            return
+
+    @callback
+    def _async_bind_listener(self, bus: TWCBus, twc_listener: TWCDirectorListener):
+        entry_data = self._hass.data[DOMAIN].get(self._entry.entry_id, None)
+
+        # The entry is being unloaded
+        if entry_data is None:
+            return
+
+        bus_data = entry_data["buses"][bus.interface]
+        bus_data["twc_listener"] = twc_listener
+        consumers = [entry_data.get(key, None) for key in LISTENER_CONSUMERS]
+        consumers += [bus_data.get(key, None) for key in BUS_LISTENER_CONSUMERS]
+
+        for consumer in consumers:
+            if consumer:
+                consumer.bind_listener(twc_listener)
+
+
+async def _async_cancel(task):
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
@@ -0,0 +1,225 @@
+"""The Tesla Wall Charger Director integration."""
+import logging
+import time
+from collections import deque
+
+import voluptuous as vol
+
+from twcdirector.device import TWCPeripheral
+from twcdirector.protocol import Commands
+
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.config_entries import ConfigEntry
+
+from .const import (
+    DOMAIN
+)
+from .health import async_time_callbacks
+
+_LOGGER = logging.getLogger(__name__)
+
+# Seconds frames are batched into one websocket message
+FLUSH_INTERVAL = 0.1
+DEFAULT_QUEUE_SIZE = 256
+MAX_QUEUE_SIZE = 4096
+
+RECORD_METER = "m"
+RECORD_STATUS = "s"
+
+
+class TWCTelemetrySubscriber:
+    """A websocket client's bounded queue of telemetry records.
+
+    Records are queued as they arrive and sent as one message every
+    FLUSH_INTERVAL seconds. A client that does not keep up loses the
+    oldest records, the number dropped since the last message is sent with
+    the next one. The subscription is closed when a config entry it
+    follows is unloaded.
+    """
+    def __init__(self, hass: HomeAssistant, serials, queue_size, send_records, close):
+        self._hass = hass
+        self._serials = set(serials) if serials else None
+        self._queue = deque(maxlen=queue_size)
+        self._send_records = send_records
+        self._close = close
+        self._dropped = 0
+        self._flush_handle = None
+
+    def wants(self, serial):
+        return self._serials is None or serial in self._serials
+
+    def push(self, record):
+        if len(self._queue) == self._queue.maxlen:
+            self._dropped += 1
+
+        self._queue.append(record)
+
+        if self._flush_handle is None:
+            self._flush_handle = self._hass.loop.call_later(FLUSH_INTERVAL, self._flush)
+
+    def stop(self):
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        self._queue.clear()
+
+    def close(self):
+        self.stop()
+        self._close()
+
+    def _flush(self):
+        self._flush_handle = None
+        records = list(self._queue)
+        self._queue.clear()
+        self._send_records(records, self._dropped)
+        self._dropped = 0
+
+
+class TWCTelemetryHub:
+    """Fan the meter and status frames of a config entry's chargers out to telemetry subscribers.
+
+    The device data callbacks are only registered while there is a
+    subscriber, so the regular entities pay nothing for the telemetry when
+    nobody is listening. Each frame is turned into a compact record once
+    and queued for every subscriber that selected its charger:
+
+        ["m", time, serial, total_kwh, v1, v2, v3, i1, i2, i3]
+        ["s", time, serial, charge_state, current_available, current_delivered]
+    """
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, discovery):
+        self._hass = hass
+        self._entry = entry
+        self._discovery = discovery
+        self._subscribers = []
+        self._devices = {}
+        self._callbacks = {}
+        self._remove_device_listener = None
+
+    def stop(self):
+        for subscriber in list(self._subscribers):
+            subscriber.close()
+
+        self._subscribers = []
+        self._stop_devices()
+
+    @callback
+    def async_add_subscriber(self, subscriber: TWCTelemetrySubscriber):
+        self._subscribers.append(subscriber)
+
+        if self._remove_device_listener is None:
+            self._remove_device_listener = self._discovery.async_add_device_listener(self.async_track_device)
+
+        @callback
+        def remove_subscriber():
+            if subscriber not in self._subscribers:
+                return
+
+            self._subscribers.remove(subscriber)
+            subscriber.stop()
+
+            if not self._subscribers:
+                self._stop_devices()
+
+        return remove_subscriber
+
+    @callback
+    def async_track_device(self, twc_device: TWCPeripheral):
+        """Follow a charger added to or bound by the discovery coordinator."""
+        # Chargers restored from the inventory send no frames until they are on the bus
+        if not self._discovery.is_live_device(twc_device):
+            return
+
+        serial = twc_device.get_serial()
+
+        if serial in self._devices:
+            self._devices[serial].deregister_device_data_updated_callback(self._callbacks[serial])
+
+        @callback
+        def meter_updated():
+            device_data = twc_device.get_device_data()
+            self._async_publish(serial, [
+                RECORD_METER, round(time.time(), 3), serial, device_data.get("total_kwh"),
+                device_data.get("voltage_phase_l1"), device_data.get("voltage_phase_l2"),
+                device_data.get("voltage_phase_l3"), device_data.get("current_phase_l1"),
+                device_data.get("current_phase_l2"), device_data.get("current_phase_l3"),
+            ])
+
+        @callback
+        def status_updated():
+            self._async_publish(serial, [
+                RECORD_STATUS, round(time.time(), 3), serial, twc_device.get_status_charge_state().name,
+                twc_device.get_status_current_available() / 100, twc_device.get_status_current_delivered() / 100,
+            ])
+
+        self._devices[serial] = twc_device
+        self._callbacks[serial] = async_time_callbacks(self._hass, self._entry, {
+            Commands.TWC_METER.name: meter_updated,
+            Commands.TWC_STATUS.name: status_updated,
+        })
+        twc_device.register_device_data_updated_callback(self._callbacks[serial])
+
+    def _stop_devices(self):
+        if self._remove_device_listener:
+            self._remove_device_listener()
+            self._remove_device_listener = None
+
+        for serial, twc_device in self._devices.items():
+            twc_device.deregister_device_data_updated_callback(self._callbacks[serial])
+
+        self._devices = {}
+        self._callbacks = {}
+
+    @callback
+    def _async_publish(self, serial, record):
+        for subscriber in self._subscribers:
+            if subscriber.wants(serial):
+                subscriber.push(record)
+
+
+@callback
+def async_register_websocket_commands(hass: HomeAssistant):
+    websocket_api.async_register_command(hass, websocket_subscribe_telemetry)
+
+
+@websocket_api.websocket_command({
+    vol.Required("type"): f"{DOMAIN}/telemetry/subscribe",
+    vol.Optional("entry_id"): str,
+    vol.Optional("serials"): [str],
+    vol.Optional("queue_size", default=DEFAULT_QUEUE_SIZE): vol.All(int, vol.Range(min=1, max=MAX_QUEUE_SIZE)),
+})
+@callback
+def websocket_subscribe_telemetry(hass: HomeAssistant, connection, msg):
+    """Stream the meter and status frames of the selected chargers without writing any states."""
+    hubs = [entry_data["telemetry"] for entry_id, entry_data in hass.data.get(DOMAIN, {}).items()
+            if "telemetry" in entry_data and msg.get("entry_id", entry_id) == entry_id]
+
+    if not hubs:
+        connection.send_error(msg["id"], websocket_api.const.ERR_NOT_FOUND, "No loaded config entry found")
+        return
+
+    @callback
+    def send_records(records, dropped):
+        connection.send_message(websocket_api.event_message(msg["id"], {"records": records, "dropped": dropped}))
+
+    @callback
+    def close():
+        # Only once, when the first of the followed entries is unloaded
+        if connection.subscriptions.pop(msg["id"], None) is None:
+            return
+
+        unsubscribe()
+        connection.send_message(websocket_api.error_message(msg["id"], websocket_api.const.ERR_NOT_FOUND,
+                                                            "The config entry was unloaded"))
+
+    subscriber = TWCTelemetrySubscriber(hass, msg.get("serials"), msg["queue_size"], send_records, close)
+    removers = [hub.async_add_subscriber(subscriber) for hub in hubs]
+
+    @callback
+    def unsubscribe():
+        for remove_subscriber in removers:
+            remove_subscriber()
+
+    connection.subscriptions[msg["id"]] = unsubscribe
+    connection.send_result(msg["id"])
@@ -0,0 +1,134 @@
+"""The Tesla Wall Charger Director integration."""
+import asyncio
+import inspect
+import logging
+import threading
+import time
+
+from homeassistant.core import HomeAssistant
+
+from .command import TWCLatencyStats
+
+_LOGGER = logging.getLogger(__name__)
+
+THREAD_JOIN_TIMEOUT = 5
+CALL_TIMEOUT = 10
+
+
+class TWCListenerThread:
+    """Event loop in a dedicated thread that runs a listener's tasks.
+
+    The serial port is read and written and frames are decoded on this
+    loop, so the bus timing does not depend on how busy the Home Assistant
+    loop is. Tasks created with create_task() return a future on the
+    calling loop that can be awaited, cancelled and watched from there.
+    """
+    def __init__(self, name):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    @property
+    def loop(self):
+        return self._loop
+
+    def start(self):
+        self._thread.start()
+
+    async def async_stop(self, hass: HomeAssistant):
+        if not self._thread.is_alive():
+            return
+
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        await hass.async_add_executor_job(self._thread.join, THREAD_JOIN_TIMEOUT)
+
+    async def async_call(self, target):
+        """Call target on the thread and return its result, the calling loop carries on until it returns."""
+        async def call_target():
+            return target()
+
+        return await asyncio.wait_for(self.create_task(call_target()), CALL_TIMEOUT)
+
+    def create_task(self, coro):
+        """Run coro on the thread's loop, return a future for it on the calling loop."""
+        return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+            self._loop.close()
+
+
+class TWCLoopHandoff:
+    """Hand calls made on the listener thread to the Home Assistant loop in batches.
+
+    Calls are queued under a lock, the first call of a batch schedules one
+    thread safe call that runs every call queued until it runs, in order.
+    Coroutine functions are started as tasks. The time from the first call
+    of a batch to the batch running is recorded.
+    """
+    def __init__(self, hass: HomeAssistant):
+        self._hass = hass
+        self._lock = threading.Lock()
+        self._pending = []
+        self._batch_started = None
+        self._latency = TWCLatencyStats()
+        self._batch_count = 0
+        self._call_count = 0
+
+    @property
+    def latency(self):
+        return self._latency
+
+    @property
+    def batch_count(self):
+        return self._batch_count
+
+    @property
+    def call_count(self):
+        return self._call_count
+
+    def call(self, target, *args):
+        """Run target(*args) on the Home Assistant loop, safe to call from any thread."""
+        with self._lock:
+            self._pending.append((target, args))
+
+            if len(self._pending) > 1:
+                return
+
+            self._batch_started = time.monotonic()
+
+        try:
+            self._hass.loop.call_soon_threadsafe(self._run_batch)
+        except RuntimeError:
+            # Home Assistant has stopped its loop
+            pass
+
+    def wrap_callback(self, update_callback):
+        """Return a callback that runs update_callback on the Home Assistant loop."""
+        def handoff_callback():
+            self.call(update_callback)
+
+        return handoff_callback
+
+    def _run_batch(self):
+        with self._lock:
+            batch = self._pending
+            self._pending = []
+            started = self._batch_started
+
+        self._latency.record(time.monotonic() - started)
+        self._batch_count += 1
+        self._call_count += len(batch)
+
+        for target, args in batch:
+            try:
+                if inspect.iscoroutinefunction(target):
+                    self._hass.async_create_task(target(*args))
+                else:
+                    target(*args)
+            except Exception:
+                _LOGGER.exception(f"Handing {target} to Home Assistant raised an exception")